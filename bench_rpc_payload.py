@@ -0,0 +1,97 @@
+import os
+import sys
+import json
+import time
+import statistics
+import httpx
+from dotenv import load_dotenv
+
+# -------------------------------
+#  CONFIG
+# -------------------------------
+load_dotenv(".hts_dashboard/.env")
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+TABLE_NAME = os.getenv("SUPABASE_TABLE", "hts_knowledge_chunks")
+
+RPC_VARIANTS = ["match_hts_chunks_full", "match_hts_chunks"]
+
+if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
+    raise RuntimeError("Set SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY env vars before running.")
+
+HEADERS = {
+    "apikey": SUPABASE_SERVICE_ROLE_KEY,
+    "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE_KEY}",
+    "Content-Type": "application/json",
+}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def sample_vector(http: httpx.Client):
+    """Use a stored embedding as the query so results are realistic."""
+    resp = http.get(
+        f"{SUPABASE_URL}/rest/v1/{TABLE_NAME}",
+        params={"select": "embedding", "embedding": "not.is.null", "limit": 1},
+    )
+    resp.raise_for_status()
+    embedding = resp.json()[0]["embedding"]
+    return json.loads(embedding) if isinstance(embedding, str) else embedding
+
+
+def bench(http: httpx.Client, rpc: str, vector, k: int, runs: int) -> dict:
+    payload = {"match_count": k, "query_embedding": vector}
+    latencies, parse_times, sizes = [], [], []
+
+    # Warm up the connection and the index
+    http.post(f"{SUPABASE_URL}/rest/v1/rpc/{rpc}", json=payload).raise_for_status()
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        resp = http.post(f"{SUPABASE_URL}/rest/v1/rpc/{rpc}", json=payload)
+        resp.raise_for_status()
+        parse_start = time.perf_counter()
+        resp.json()
+        end = time.perf_counter()
+
+        latencies.append((end - start) * 1000)
+        parse_times.append((end - parse_start) * 1000)
+        sizes.append(len(resp.content))
+
+    return {
+        "rpc": rpc,
+        "bytes": statistics.mean(sizes),
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "parse_p50": percentile(parse_times, 50),
+    }
+
+
+def main():
+    # Usage: python bench_rpc_payload.py [match_count] [runs]
+    k = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+
+    with httpx.Client(headers=HEADERS, timeout=30) as http:
+        vector = sample_vector(http)
+        print(f"📏 Benchmarking match_count={k}, {runs} runs per variant\n")
+
+        results = [bench(http, rpc, vector, k, runs) for rpc in RPC_VARIANTS]
+
+    print(f"{'RPC':<24}{'payload':>12}{'p50 ms':>10}{'p95 ms':>10}{'parse ms':>10}")
+    for r in results:
+        print(f"{r['rpc']:<24}{r['bytes'] / 1024:>9.1f} KB{r['p50']:>10.1f}{r['p95']:>10.1f}{r['parse_p50']:>10.2f}")
+
+    full, slim = results
+    print(
+        f"\n✅ Slim RPC: {100 * (1 - slim['bytes'] / full['bytes']):.0f}% smaller payload, "
+        f"p95 {full['p95']:.1f} → {slim['p95']:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
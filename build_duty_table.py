@@ -0,0 +1,48 @@
+import sys
+import time
+import random
+
+import numpy as np
+
+from utils.duty_table import DutyTable, DUTY_TABLE_PATH, RATE_UNKNOWN
+from utils.hts_source import HTS_JSON_PATH, file_fingerprint, load_hts_items
+
+
+def main():
+    # Usage: python build_duty_table.py [path/to/hts.json]
+    json_path = sys.argv[1] if len(sys.argv) > 1 else HTS_JSON_PATH
+
+    print(f"📥 Reading duty rates from {json_path}...")
+    start = time.time()
+    items = load_hts_items(json_path)
+    table = DutyTable.from_items(items, source=file_fingerprint(json_path)[:16])
+    kinds = np.bincount(table.kinds, minlength=5)
+    print(
+        f"✅ {len(table)} rated codes in {time.time() - start:.1f}s: "
+        f"{kinds[1]} free, {kinds[2]} ad valorem, {kinds[3]} specific, {kinds[4]} compound, "
+        f"{kinds[RATE_UNKNOWN]} unparsed"
+    )
+
+    table.save(DUTY_TABLE_PATH)
+    print(f"💾 Saved duty table to {DUTY_TABLE_PATH}")
+
+    # Quick latency check: categorize 1,000 random codes, cold and memoized
+    codes = random.sample(table.codes.tolist(), min(1000, len(table)))
+    table = DutyTable.load(DUTY_TABLE_PATH)
+    for label in ("cold", "memoized"):
+        start = time.perf_counter()
+        table.categorize(codes)
+        print(f"⚡ categorize({len(codes)} codes), {label}: {(time.perf_counter() - start) * 1e6:.0f}µs")
+
+    values = np.random.uniform(100, 10000, len(codes))
+    quantities = np.random.uniform(1, 500, len(codes))
+    start = time.perf_counter()
+    duties = table.estimate_landed_duty(codes, values, quantities)
+    print(
+        f"⚡ estimate_landed_duty({len(codes)} lines): {(time.perf_counter() - start) * 1e6:.0f}µs, "
+        f"{np.isnan(duties).sum()} unpriced"
+    )
+
+
+if __name__ == "__main__":
+    main()
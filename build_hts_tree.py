@@ -0,0 +1,38 @@
+import sys
+import time
+import random
+
+from utils.hts_tree import HTSTree, HTS_TREE_PATH
+from utils.hts_source import HTS_JSON_PATH, file_fingerprint, load_hts_items
+
+
+def main():
+    # Usage: python build_hts_tree.py [path/to/hts.json]
+    json_path = sys.argv[1] if len(sys.argv) > 1 else HTS_JSON_PATH
+
+    print(f"📥 Reading HTS hierarchy from {json_path}...")
+    start = time.time()
+    items = load_hts_items(json_path)
+    tree = HTSTree.from_items(items, source=file_fingerprint(json_path)[:16])
+    print(
+        f"✅ {len(tree)} nodes under {len(tree.roots)} chapters in {time.time() - start:.1f}s, "
+        f"max depth {int(tree.indents.max()) + 2 if len(tree) else 0}"
+    )
+
+    tree.save(HTS_TREE_PATH)
+    print(f"💾 Saved HTS tree to {HTS_TREE_PATH}")
+
+    # Quick latency check: load time and breadcrumbs for 1,000 random codes
+    start = time.perf_counter()
+    tree = HTSTree.load(HTS_TREE_PATH)
+    print(f"⚡ load: {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    codes = random.sample([c for c in tree.codes.tolist() if c], min(1000, len(tree)))
+    start = time.perf_counter()
+    for code in codes:
+        tree.breadcrumb(code)
+    print(f"⚡ breadcrumb({len(codes)} codes): {(time.perf_counter() - start) * 1e6:.0f}µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import os
+import sys
+import time
+from supabase import create_client
+from dotenv import load_dotenv
+
+from utils.vector_index import LocalVectorIndex, LOCAL_INDEX_PATH, LOCAL_INDEX_DTYPE
+
+# -------------------------------
+#  CONFIG
+# -------------------------------
+load_dotenv(".hts_dashboard/.env")
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+TABLE_NAME = os.getenv("SUPABASE_TABLE", "hts_knowledge_chunks")
+
+if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
+    raise RuntimeError("Set SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY env vars before running.")
+
+
+def main():
+    # Usage: python build_local_index.py [float32|float16]
+    dtype = sys.argv[1] if len(sys.argv) > 1 else LOCAL_INDEX_DTYPE
+
+    supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+
+    print(f"📥 Downloading embeddings from {TABLE_NAME}...")
+    start = time.time()
+    index = LocalVectorIndex.from_supabase(supabase, TABLE_NAME, dtype=dtype)
+    print(f"✅ Loaded {len(index)} rows ({index.matrix.nbytes / 1e6:.1f} MB as {dtype}) in {time.time() - start:.1f}s")
+
+    index.save(LOCAL_INDEX_PATH)
+    print(f"💾 Saved index to {LOCAL_INDEX_PATH}")
+
+    # Quick latency check using a stored row as the query
+    query = index.matrix[0].astype("float32")
+    start = time.time()
+    for _ in range(20):
+        index.search(query, 10)
+    print(f"⚡ Average search time: {(time.time() - start) / 20 * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
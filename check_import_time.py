@@ -0,0 +1,78 @@
+import os
+import sys
+import subprocess
+
+# -------------------------------
+#  CONFIG
+# -------------------------------
+# Modules the pages import on every cold start
+MODULES = [
+    "utils.search",
+    "utils.embeddings",
+    "utils.llm_explain",
+    "utils.supabase_db",
+    "utils.bulk_classify",
+    "utils.snapshot",
+    "components.hierarchy_viz",
+]
+
+# SDKs that must only be imported on first use, never at module import
+DEFERRED_PACKAGES = ["openai", "supabase", "httpx", "plotly", "pandas"]
+
+# Cumulative import time allowed per module (includes streamlit itself)
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1500"))
+
+
+def import_profile(module: str) -> dict[str, int]:
+    """
+    Import `module` in a fresh interpreter with -X importtime and return
+    {imported module: cumulative microseconds}.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = int(cumulative)
+    return timings
+
+
+def main():
+    failures = []
+    print(f"⏱️  Import budget: {IMPORT_BUDGET_MS:.0f} ms per module\n")
+
+    for module in MODULES:
+        timings = import_profile(module)
+        elapsed_ms = timings.get(module, 0) / 1000
+        eager = [pkg for pkg in DEFERRED_PACKAGES if pkg in timings]
+
+        status = "✅"
+        if elapsed_ms > IMPORT_BUDGET_MS:
+            status = "❌"
+            failures.append(f"{module} took {elapsed_ms:.0f} ms")
+        if eager:
+            status = "❌"
+            failures.append(f"{module} imports {', '.join(eager)} at import time")
+
+        print(f"{status} {module:<28}{elapsed_ms:>8.0f} ms")
+
+    if failures:
+        print("\n❌ Import budget exceeded:")
+        for failure in failures:
+            print(f"   - {failure}")
+        sys.exit(1)
+
+    print("\n✅ All modules within budget")
+
+
+if __name__ == "__main__":
+    main()
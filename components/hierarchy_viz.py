@@ -5,10 +5,80 @@ This module provides interactive visualization of the HTS code hierarchy
 using Plotly for tree diagrams and navigation.
 """
 
+from __future__ import annotations
+
+import os
+import threading
 import streamlit as st
-import plotly.graph_objects as go
 import textwrap
-from typing import List, Dict
+from collections import OrderedDict
+from typing import TYPE_CHECKING, List, Dict, Optional
+
+if TYPE_CHECKING:
+    # Plotly is only imported when a chart is actually drawn
+    import plotly.graph_objects as go
+
+# Expanded nodes whose child lists are kept in memory
+HIERARCHY_CACHE_SIZE = int(os.environ.get("HIERARCHY_CACHE_SIZE", "64"))
+
+_children_cache = OrderedDict()
+_children_lock = threading.Lock()
+
+
+def _group_codes(codes: List[Dict[str, str]]) -> Dict[str, Dict]:
+    """
+    Group codes into {chapter: {'title', 'children': {heading: {'title',
+    'count', 'children'}}}}.
+    
+    Titles and counts come from the prebuilt HTS tree when available, so a
+    heading is labelled with its own description and counted by the codes
+    under it in the schedule. Without the tree, codes are grouped by string
+    prefix and a heading takes the title of its first code.
+    """
+    from utils.hts_tree import get_hts_tree
+    
+    tree = get_hts_tree()
+    hierarchy = {}
+    
+    for code_data in codes:
+        code = code_data.get('hts_code', '')
+        title = code_data.get('title', 'Untitled')
+        if len(code) < 2:
+            continue
+        
+        chapter, chapter_title = code[:2], f"Chapter {code[:2]}"
+        heading = heading_title = heading_count = None
+        
+        node = tree.find(code) if tree is not None else -1
+        if node >= 0:
+            path = tree.ancestors(node)
+            chapter, chapter_title = str(tree.codes[path[0]]), str(tree.descriptions[path[0]])
+            if len(path) > 1:
+                heading = str(tree.codes[path[1]]) or code[:4]
+                heading_title = str(tree.descriptions[path[1]])
+                heading_count = int(tree.subtree_sizes[path[1]]) - 1
+        elif len(code) >= 4:
+            heading, heading_title = code[:4], title
+        
+        chapter_data = hierarchy.setdefault(chapter, {'title': chapter_title, 'children': {}})
+        if heading is None:
+            continue
+        
+        heading_data = chapter_data['children'].setdefault(heading, {
+            'title': heading_title,
+            'count': heading_count,
+            'children': [],
+        })
+        if code != heading:
+            heading_data['children'].append({'code': code, 'title': title})
+    
+    # Without the tree, count the codes that were passed in
+    for chapter_data in hierarchy.values():
+        for heading_data in chapter_data['children'].values():
+            if heading_data['count'] is None:
+                heading_data['count'] = len(heading_data['children'])
+    
+    return hierarchy
 
 
 def create_hierarchy_tree(codes: List[Dict[str, str]]) -> go.Figure:
@@ -21,36 +91,9 @@ def create_hierarchy_tree(codes: List[Dict[str, str]]) -> go.Figure:
     Returns:
         Plotly Figure object
     """
+    import plotly.graph_objects as go
     
-    # Build hierarchy structure
-    hierarchy = {}
-    
-    for code_data in codes:
-        code = code_data.get('hts_code', '')
-        title = code_data.get('title', 'Untitled')
-        
-        # Extract hierarchy levels
-        if len(code) >= 2:
-            chapter = code[:2]
-            if chapter not in hierarchy:
-                hierarchy[chapter] = {
-                    'title': f"Chapter {chapter}",
-                    'children': {}
-                }
-            
-            if len(code) >= 4:
-                heading = code[:4]
-                if heading not in hierarchy[chapter]['children']:
-                    hierarchy[chapter]['children'][heading] = {
-                        'title': title[:40],
-                        'children': []
-                    }
-                
-                if len(code) > 4:
-                    hierarchy[chapter]['children'][heading]['children'].append({
-                        'code': code,
-                        'title': title
-                    })
+    hierarchy = _group_codes(codes)
     
     # Create tree diagram using Plotly
     labels = []
@@ -79,9 +122,9 @@ def create_hierarchy_tree(codes: List[Dict[str, str]]) -> go.Figure:
         
         # Add headings
         for heading, heading_data in chapter_data['children'].items():
-            labels.append(f"{heading}: {heading_data['title']}")
+            labels.append(f"{heading}: {heading_data['title'][:40]}")
             parents.append(f"{chapter}: {chapter_data['title']}")
-            values.append(len(heading_data['children']) if heading_data['children'] else 1)
+            values.append(heading_data['count'] or 1)
             colors.append(chapter_colors[idx % len(chapter_colors)])
     
     # Create sunburst chart
@@ -138,61 +181,164 @@ def render_breadcrumb(path: List[str]) -> None:
     st.markdown(breadcrumb_html, unsafe_allow_html=True)
 
 
-def hierarchy_explorer(codes: List[Dict[str, str]]) -> None:
+def node_children(key=None) -> List[Dict]:
+    """
+    Children of one hierarchy node, read from the HTS tree when it has been
+    built and from a prefix-range query on the local snapshot otherwise.
+    The most recently opened nodes are kept in a small LRU.
+    
+    Args:
+        key: 'key' of a node returned by an earlier call (None for chapters)
+    
+    Returns:
+        List of dicts with 'key', 'hts_code', 'title' and 'count' (entries
+        below the child), in schedule order
+    """
+    from utils import snapshot
+    from utils.hts_tree import get_hts_tree
+    
+    tree = get_hts_tree()
+    if tree is not None:
+        source = ("tree", tree.source, len(tree))
+    elif snapshot.snapshot_available():
+        source = ("snapshot", snapshot.snapshot_info().get("version"))
+    else:
+        return []
+    
+    cache_key = (source, key)
+    with _children_lock:
+        if cache_key in _children_cache:
+            _children_cache.move_to_end(cache_key)
+            return _children_cache[cache_key]
+    
+    if tree is not None:
+        nodes = tree.roots.tolist() if key is None else tree.children(key)
+        children = [
+            {
+                'key': node,
+                'hts_code': str(tree.codes[node]),
+                'title': str(tree.descriptions[node]),
+                'count': int(tree.subtree_sizes[node]) - 1,
+            }
+            for node in nodes
+        ]
+    else:
+        children = [dict(row, key=row['hts_code']) for row in snapshot.code_children(key or "")]
+    
+    with _children_lock:
+        _children_cache[cache_key] = children
+        while len(_children_cache) > HIERARCHY_CACHE_SIZE:
+            _children_cache.popitem(last=False)
+    
+    return children
+
+
+def _node_label(node: Dict, width: int = 80) -> str:
+    title = node.get('title') or 'Untitled'
+    if len(title) > width:
+        title = title[:width - 1].rstrip() + "…"
+    code = node.get('hts_code') or ''
+    return title if not code or title.startswith("Chapter") else f"{code} {title}"
+
+
+def _set_path(path_key: str, path: List[Dict]) -> None:
+    st.session_state[path_key] = path
+
+
+def lazy_hierarchy_explorer(state_key: str = "hierarchy") -> None:
+    """
+    Drill-down view of the full HTS schedule. Only the children of the
+    opened node are fetched and rendered; the open path lives in
+    st.session_state[f"{state_key}_path"].
+    
+    Args:
+        state_key: Prefix for session state and widget keys, so several
+            explorers can live on one page
+    """
+    
+    path_key = f"{state_key}_path"
+    path = st.session_state.setdefault(path_key, [])
+    
+    children = node_children(path[-1]['key'] if path else None)
+    if not children and not path:
+        st.info("💡 Run `python build_hts_tree.py` or sync the local snapshot to browse the HTS hierarchy.")
+        return
+    
+    # Breadcrumb: each level jumps back up the path
+    crumbs = [{'label': "🏠 All Chapters"}] + path
+    for depth, (col, crumb) in enumerate(zip(st.columns(len(crumbs)), crumbs)):
+        col.button(
+            crumb['label'],
+            key=f"{state_key}_crumb_{depth}",
+            on_click=_set_path,
+            args=(path_key, path[:depth]),
+            disabled=depth == len(path),
+            use_container_width=True,
+        )
+    
+    st.caption(f"{len(children):,} entries")
+    
+    for child in children:
+        if child['count']:
+            st.button(
+                f"📁 {_node_label(child)} ({child['count']:,})",
+                key=f"{state_key}_open_{child['key']}",
+                on_click=_set_path,
+                args=(path_key, path + [{'key': child['key'], 'label': _node_label(child, width=24)}]),
+                use_container_width=True,
+            )
+        else:
+            st.markdown(
+                textwrap.dedent(f"""
+                <div class="glass-card" style="padding: 12px; margin-bottom: 8px;">
+                    <strong style="color: var(--accent-blue);">{child.get('hts_code') or '—'}</strong>
+                    <p style="margin: 4px 0 0 0; font-size: 14px; color: rgba(255, 255, 255, 0.8);">
+                        {child.get('title') or 'No title'}
+                    </p>
+                </div>
+                """),
+                unsafe_allow_html=True
+            )
+
+
+def hierarchy_explorer(codes: Optional[List[Dict[str, str]]] = None, state_key: str = "hierarchy") -> None:
     """
     Render an interactive hierarchy explorer with visualization.
     
     Args:
-        codes: List of HTS codes with metadata
+        codes: HTS codes with metadata for the sunburst chart
+        state_key: Session state prefix for the drill-down view
     """
     
     st.markdown('<h3 class="section-title" style="font-size: 24px;">🌳 HTS Hierarchy Visualization</h3>', unsafe_allow_html=True)
     
-    # Create tabs for different views
-    tab1, tab2 = st.tabs(["📊 Sunburst Chart", "📋 Tree View"])
+    # Only the selected view is built; tabs would render both on every rerun
+    view = st.radio(
+        "View",
+        ["🧭 Drill Down", "📊 Sunburst Chart"],
+        horizontal=True,
+        label_visibility="collapsed",
+        key=f"{state_key}_view",
+    )
     
-    with tab1:
+    if view == "🧭 Drill Down":
         st.markdown(
-            '<p class="subtitle">Interactive sunburst chart showing HTS code hierarchy. Click segments to zoom in.</p>',
+            '<p class="subtitle">Open a chapter, heading or subheading to load the level below it.</p>',
             unsafe_allow_html=True
         )
-        
-        fig = create_hierarchy_tree(codes)
-        st.plotly_chart(fig, use_container_width=True)
-        
-        st.info("💡 Click on any segment to zoom in. Click the center to zoom out.")
+        lazy_hierarchy_explorer(state_key)
+        return
     
-    with tab2:
-        st.markdown(
-            '<p class="subtitle">Expandable tree view of HTS codes organized by chapter and heading.</p>',
-            unsafe_allow_html=True
-        )
-        
-        # Group codes by chapter
-        chapters = {}
-        for code_data in codes:
-            code = code_data.get('hts_code', '')
-            if len(code) >= 2:
-                chapter = code[:2]
-                if chapter not in chapters:
-                    chapters[chapter] = []
-                chapters[chapter].append(code_data)
-        
-        # Display as expandable tree
-        for chapter, chapter_codes in sorted(chapters.items()):
-            with st.expander(f"📁 Chapter {chapter} ({len(chapter_codes)} codes)", expanded=False):
-                for code_data in chapter_codes[:10]:  # Limit to first 10 for performance
-                    st.markdown(
-                        textwrap.dedent(f"""
-                        <div class="glass-card" style="padding: 12px; margin-bottom: 8px;">
-                            <strong style="color: var(--accent-blue);">{code_data.get('hts_code')}</strong>
-                            <p style="margin: 4px 0 0 0; font-size: 14px; color: rgba(255, 255, 255, 0.8);">
-                                {code_data.get('title', 'No title')[:100]}
-                            </p>
-                        </div>
-                        """),
-                        unsafe_allow_html=True
-                    )
-                
-                if len(chapter_codes) > 10:
-                    st.info(f"... and {len(chapter_codes) - 10} more codes in this chapter")
+    st.markdown(
+        '<p class="subtitle">Interactive sunburst chart showing HTS code hierarchy. Click segments to zoom in.</p>',
+        unsafe_allow_html=True
+    )
+    
+    if not codes:
+        st.info("No codes to chart yet.")
+        return
+    
+    fig = create_hierarchy_tree(codes)
+    st.plotly_chart(fig, use_container_width=True)
+    
+    st.info("💡 Click on any segment to zoom in. Click the center to zoom out.")
@@ -0,0 +1,187 @@
+import os
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict
+
+from openai import OpenAI
+from supabase import create_client, Client
+from dotenv import load_dotenv
+
+from utils.hts_source import (
+    HTS_JSON_PATH,
+    assign_source_refs,
+    content_hash,
+    file_fingerprint,
+    flatten_hts_item,
+    load_hts_items,
+)
+from utils.retry import RetryPolicy, retry_call
+
+# ---------- Config ----------
+load_dotenv(".hts_dashboard/.env")
+MODEL = os.environ.get("EMBEDDING_MODEL", "text-embedding-3-small")
+TABLE_NAME = os.environ.get("SUPABASE_TABLE", "hts_knowledge_chunks")
+BATCH_SIZE = int(os.environ.get("INGEST_BATCH_SIZE", "128"))
+EMBED_WORKERS = int(os.environ.get("INGEST_EMBED_WORKERS", "4"))
+UPSERT_WORKERS = int(os.environ.get("INGEST_UPSERT_WORKERS", "4"))
+STATE_PATH = os.environ.get("INGEST_STATE_PATH", ".hts_cache/ingest_state.json")
+
+# Rows are upserted on this unique key (see supabase_rpc_fix.sql)
+CONFLICT_COLUMN = "source_ref"
+
+
+# ---------- Checkpoint ----------
+
+class Checkpoint:
+    """
+    Records which batch offsets have been fully upserted so an interrupted
+    run can resume where it stopped.
+    """
+
+    def __init__(self, path: str, fingerprint: str, batch_size: int):
+        self.path = path
+        self.key = {"source": fingerprint, "model": MODEL, "batch_size": batch_size}
+        self.completed = set()
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                state = json.load(f)
+            if state.get("key") == self.key:
+                self.completed = set(state.get("completed", []))
+            else:
+                print("ℹ️ Checkpoint belongs to a different source, model or batch size. Starting fresh.")
+
+    def mark(self, offset: int) -> None:
+        with self._lock:
+            self.completed.add(offset)
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            # Write-then-rename so a crash never leaves a truncated file
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"key": self.key, "completed": sorted(self.completed)}, f)
+            os.replace(tmp_path, self.path)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.completed = set()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+
+# ---------- Helpers ----------
+
+# Jittered backoff keeps parallel workers from retrying in lockstep
+RETRY_POLICY = RetryPolicy(max_attempts=5, base_delay=1.0, max_delay=30.0)
+
+
+def with_retries(label: str, fn, *args):
+    try:
+        return retry_call(fn, *args, policy=RETRY_POLICY, label=label)
+    except Exception as e:
+        raise RuntimeError(f"[{label}] Failed: {e}") from e
+
+
+def build_rows(items: List[Dict]) -> List[Dict]:
+    """Turn source items into table rows (without embeddings)."""
+    rows = []
+    for item, ref in zip(items, assign_source_refs(items)):
+        rows.append({
+            "hts_code": item.get("htsno", ""),
+            "title": (item.get("description") or "").strip(),
+            "source_type": "hts",
+            "source_ref": ref,
+            "normalized_text": flatten_hts_item(item),
+        })
+    return rows
+
+
+def embed_rows(client: OpenAI, rows: List[Dict]) -> List[Dict]:
+    resp = client.embeddings.create(
+        model=MODEL,
+        input=[row["normalized_text"] for row in rows],
+    )
+    embeddings = [d.embedding for d in sorted(resp.data, key=lambda d: d.index)]
+    return [
+        {**row, "embedding": emb, "content_hash": content_hash(row["normalized_text"], MODEL)}
+        for row, emb in zip(rows, embeddings)
+    ]
+
+
+def upsert_rows(supabase: Client, rows: List[Dict]) -> None:
+    supabase.table(TABLE_NAME).upsert(rows, on_conflict=CONFLICT_COLUMN).execute()
+
+
+# ---------- Main ----------
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or refresh the HTS knowledge base in Supabase.")
+    parser.add_argument("--json", default=HTS_JSON_PATH, help="Path to the HTS JSON export")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--embed-workers", type=int, default=EMBED_WORKERS)
+    parser.add_argument("--upsert-workers", type=int, default=UPSERT_WORKERS)
+    parser.add_argument("--restart", action="store_true", help="Ignore any checkpoint and process every batch")
+    args = parser.parse_args()
+
+    client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
+    supabase: Client = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_SERVICE_ROLE_KEY"])
+
+    items = load_hts_items(args.json)
+    rows = build_rows(items)
+    total = len(rows)
+    print(f"Loaded {total} HTS records from {args.json}")
+
+    checkpoint = Checkpoint(STATE_PATH, file_fingerprint(args.json), args.batch_size)
+    if args.restart:
+        checkpoint.reset()
+
+    pending = [
+        (offset, rows[offset:offset + args.batch_size])
+        for offset in range(0, total, args.batch_size)
+        if offset not in checkpoint.completed
+    ]
+    num_batches = (total + args.batch_size - 1) // args.batch_size
+    skipped = num_batches - len(pending)
+    if skipped:
+        print(f"⏩ Resuming: {skipped} batches already completed")
+
+    # Keep a bounded number of batches in memory at once
+    max_in_flight = 2 * (args.embed_workers + args.upsert_workers)
+    pending.reverse()
+    in_flight = {}
+    done_rows = 0
+    start = time.time()
+
+    with ThreadPoolExecutor(args.embed_workers) as embed_pool, ThreadPoolExecutor(args.upsert_workers) as upsert_pool:
+        while pending or in_flight:
+            while pending and len(in_flight) < max_in_flight:
+                offset, batch = pending.pop()
+                future = embed_pool.submit(with_retries, "embed", embed_rows, client, batch)
+                in_flight[future] = ("embed", offset, batch)
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, offset, batch = in_flight.pop(future)
+                result = future.result()
+
+                if stage == "embed":
+                    next_future = upsert_pool.submit(with_retries, "upsert", upsert_rows, supabase, result)
+                    in_flight[next_future] = ("upsert", offset, batch)
+                else:
+                    checkpoint.mark(offset)
+                    done_rows += len(batch)
+                    rate = done_rows / max(time.time() - start, 1e-6)
+                    print(f"Upserted batch @{offset} "
+                          f"({len(checkpoint.completed)}/{num_batches} batches, {rate:.0f} rows/s)")
+
+    print(f"✅ Finished building HTS knowledge base in {time.time() - start:.1f}s.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,10 @@
+import time
 import streamlit as st
 import textwrap
 from utils.search import semantic_search_hts
+from utils.analytics import log_search
 from utils.ui import inject_global_css, page_header, result_card
-from utils.duty_rates import get_duty_category
+from utils.duty_rates import get_duty_categories
 
 st.set_page_config(
     page_title="HTS Search - HTS Dashboard",
@@ -58,7 +60,7 @@ with col2:
 
 # Advanced filters
 with st.expander("Advanced Filters", expanded=False):
-    col_a, col_b, col_c = st.columns(3)
+    col_a, col_b, col_c, col_d = st.columns(4)
     
     with col_a:
         min_similarity = st.slider(
@@ -77,6 +79,13 @@ with st.expander("Advanced Filters", expanded=False):
         )
     
     with col_c:
+        code_prefix = st.text_input(
+            "Chapter / Heading",
+            placeholder="e.g., 39 or 8471.30",
+            help="Only return codes under this chapter or heading",
+        )
+    
+    with col_d:
         sort_by = st.selectbox(
             "Sort By",
             options=["Relevance", "HTS Code", "Duty Rate"],
@@ -92,8 +101,22 @@ if search_button:
     if not query.strip():
         st.error("Please enter a search query")
     else:
+        # Per-stage timings for the telemetry log
+        trace = {}
+        start = time.perf_counter()
         with st.spinner("Searching HTS database..."):
-            results = semantic_search_hts(query, k)
+            try:
+                results = semantic_search_hts(
+                    query,
+                    k,
+                    code_prefix=code_prefix.strip() or None,
+                    min_similarity=min_similarity if min_similarity > 0 else None,
+                    trace=trace,
+                )
+            except Exception as e:
+                log_search(query, [], (time.perf_counter() - start) * 1000, trace, error=str(e))
+                raise
+        log_search(query, results, (time.perf_counter() - start) * 1000, trace)
         
         if not results:
             st.warning("No results found. Try different keywords or broader terms.")
@@ -101,14 +124,23 @@ if search_button:
             # Apply filters
             filtered_results = results
             
-            # Filter by similarity
-            filtered_results = [r for r in filtered_results if r.get('similarity', 0.85) >= min_similarity]
+            # Filter by similarity; code matches have no score and always pass
+            filtered_results = [
+                r for r in filtered_results
+                if r.get('similarity') is None or r['similarity'] >= min_similarity
+            ]
+            
+            # Look up every duty category once for filtering, sorting and display
+            duty_categories = dict(zip(
+                (id(r) for r in filtered_results),
+                get_duty_categories([r['hts_code'] for r in filtered_results]),
+            ))
             
             # Filter by duty category
             if duty_filter:
                 filtered_results = [
                     r for r in filtered_results
-                    if get_duty_category(r['hts_code']) in duty_filter
+                    if duty_categories[id(r)] in duty_filter
                 ]
             
             # Sort results
@@ -116,7 +148,7 @@ if search_button:
                 filtered_results.sort(key=lambda x: x['hts_code'])
             elif sort_by == "Duty Rate":
                 duty_order = {"Free": 0, "Low": 1, "Medium": 2, "High": 3}
-                filtered_results.sort(key=lambda x: duty_order.get(get_duty_category(x['hts_code']), 2))
+                filtered_results.sort(key=lambda x: duty_order.get(duty_categories[id(x)], 2))
             
             st.markdown("---")
             st.markdown(f"## Found {len(filtered_results)} matches for '{query}'")
@@ -125,8 +157,8 @@ if search_button:
                 st.info("No results match your filters. Try adjusting the filter criteria.")
             else:
                 for idx, r in enumerate(filtered_results):
-                    similarity = r.get('similarity', 0.85)
-                    duty_category = get_duty_category(r['hts_code'])
+                    similarity = r.get('similarity')
+                    duty_category = duty_categories[id(r)]
                     
                     result_card(
                         hts_code=r['hts_code'],
@@ -134,6 +166,7 @@ if search_button:
                         description=r.get('normalized_text', 'No additional details available'),
                         similarity=similarity,
                         duty_rate=duty_category,
+                        match_source=r.get('match_source', ''),
                     )
 
 # Sidebar info
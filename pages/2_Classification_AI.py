@@ -1,8 +1,21 @@
+import os
+import time
 import streamlit as st
 import textwrap
 from utils.llm import classify_hts
+from utils.analytics import log_search
+from utils.bulk_classify import (
+    BULK_MAX_WORKERS,
+    BULK_OUTPUT_DIR,
+    DUTY_FIELDS,
+    RESULT_FIELDS,
+    BulkResultWriter,
+    classify_catalog,
+    price_results,
+    read_catalog,
+)
 from utils.ui import inject_global_css, page_header, result_card
-from utils.llm_explain import explain_classification
+from utils.llm_explain import cached_explanation, explain_classification_stream, explain_many, explanation_cache_key
 from utils.duty_rates import get_duty_category
 
 st.set_page_config(
@@ -74,68 +87,213 @@ if classify_button:
     if not desc.strip():
         st.error("Please enter a product description")
     else:
+        trace = {}
+        start = time.perf_counter()
         with st.spinner("Analyzing product and searching HTS database..."):
-            results = classify_hts(desc, k)
+            try:
+                results = classify_hts(desc, k, trace=trace)
+            except Exception as e:
+                log_search(desc, [], (time.perf_counter() - start) * 1000, trace, kind="classify", error=str(e))
+                raise
+        log_search(desc, results, (time.perf_counter() - start) * 1000, trace, kind="classify")
+        # Keep results across reruns so the explanation buttons below work
+        st.session_state["classification"] = {"desc": desc, "results": results}
+
+classification = st.session_state.get("classification")
+
+if classification is not None:
+    results = classification["results"]
+    classified_desc = classification["desc"]
+
+    if not results:
+        st.warning("No results found. Try a different description or broader terms.")
+    else:
+        st.markdown("---")
+        st.markdown(f"## Top {len(results)} Classifications")
+        
+        explain_all = False
+        if show_explanations:
+            explain_all = st.button(
+                "✨ Explain All",
+                help="Generate explanations for every suggestion in parallel",
+            )
+        # Explanation placeholders, filled as parallel explanations finish
+        explain_slots = {}
         
-        if not results:
-            st.warning("No results found. Try a different description or broader terms.")
-        else:
-            st.markdown("---")
-            st.markdown(f"## Top {len(results)} Classifications")
+        # Display results
+        for idx, r in enumerate(results):
+            similarity = r.get('similarity')
+            duty_category = get_duty_category(r['hts_code'])
+            
+            # Render result card from UI library
+            result_card(
+                hts_code=r['hts_code'],
+                title=r['title'],
+                description=r.get('normalized_text', 'No additional details available'),
+                similarity=similarity,
+                duty_rate=duty_category,
+                match_source=r.get('match_source', ''),
+            )
             
-            # Display results
-            for idx, r in enumerate(results):
-                similarity = r.get('similarity', 0.85)
-                duty_category = get_duty_category(r['hts_code'])
+            # AI Explanation section
+            if show_explanations:
+                cache_key = explanation_cache_key(classified_desc, r['hts_code'])
+                explain_key = f"explain_{idx}_{cache_key[:16]}"
                 
-                # Render result card from UI library
-                result_card(
-                    hts_code=r['hts_code'],
-                    title=r['title'],
-                    description=r.get('normalized_text', 'No additional details available'),
-                    similarity=similarity,
-                    duty_rate=duty_category,
-                )
+                if explain_key not in st.session_state:
+                    # Reuse an explanation generated in an earlier session
+                    st.session_state[explain_key] = cached_explanation(classified_desc, r['hts_code'])
                 
-                # AI Explanation section
-                if show_explanations:
-                    explain_key = f"explain_{idx}_{r['hts_code']}"
-                    
-                    if explain_key not in st.session_state:
-                        st.session_state[explain_key] = None
-                    
-                    col_a, col_b = st.columns([1, 4])
-                    
-                    with col_a:
-                        if st.button(
-                            "Generate Explanation" if not st.session_state[explain_key] else "Regenerate",
-                            key=f"btn_{explain_key}",
-                            use_container_width=True
-                        ):
-                            with st.spinner("🧠 Generating explanation..."):
-                                explanation = explain_classification(
-                                    product_description=desc,
-                                    hts_code=r['hts_code'],
-                                    hts_title=r['title'],
-                                    context=r.get('normalized_text', '')
-                                )
-                                st.session_state[explain_key] = explanation
-                    
-                    if st.session_state[explain_key]:
-                        st.info(f"**AI Reasoning:**\n\n{st.session_state[explain_key]}")
+                col_a, col_b = st.columns([1, 4])
                 
-                # Action buttons
-                btn1, btn2, btn3 = st.columns(3)
-                with btn1:
-                    if st.button("📋 Copy Code", key=f"copy_{idx}", use_container_width=True):
-                        st.code(r['hts_code'], language=None)
-                with btn2:
-                    if st.button("View Details", key=f"browser_{idx}", use_container_width=True):
-                        st.info(f"HTS Browser link for {r['hts_code']}")
-                with btn3:
-                    st.button("📊 Analytics", key=f"analytics_{idx}", use_container_width=True, disabled=True)
+                with col_a:
+                    generate = st.button(
+                        "Generate Explanation" if not st.session_state[explain_key] else "Regenerate",
+                        key=f"btn_{explain_key}",
+                        use_container_width=True
+                    )
                 
-                st.markdown("<br>", unsafe_allow_html=True)
+                slot = st.empty()
+                explain_slots[idx] = (slot, explain_key)
+                
+                if generate:
+                    # Stream tokens as they arrive; the full text is kept for later reruns
+                    with slot.container(border=True):
+                        st.markdown("**AI Reasoning:**")
+                        st.session_state[explain_key] = st.write_stream(
+                            explain_classification_stream(
+                                product_description=classified_desc,
+                                hts_code=r['hts_code'],
+                                hts_title=r['title'],
+                                context=r.get('normalized_text', ''),
+                                refresh=bool(st.session_state[explain_key]),
+                            )
+                        )
+                elif st.session_state[explain_key]:
+                    slot.info(f"**AI Reasoning:**\n\n{st.session_state[explain_key]}")
+                elif explain_all:
+                    slot.info("🧠 Generating explanation...")
+            
+            # Action buttons
+            btn1, btn2, btn3 = st.columns(3)
+            with btn1:
+                if st.button("📋 Copy Code", key=f"copy_{idx}", use_container_width=True):
+                    st.code(r['hts_code'], language=None)
+            with btn2:
+                if st.button("View Details", key=f"browser_{idx}", use_container_width=True):
+                    st.info(f"HTS Browser link for {r['hts_code']}")
+            with btn3:
+                st.button("📊 Analytics", key=f"analytics_{idx}", use_container_width=True, disabled=True)
+            
+            st.markdown("<br>", unsafe_allow_html=True)
+        
+        if explain_all:
+            # Fan out the missing explanations; render each one as it completes
+            missing = [idx for idx, (_, key) in explain_slots.items() if not st.session_state[key]]
+            for pos, explanation in explain_many(classified_desc, [results[idx] for idx in missing]):
+                slot, key = explain_slots[missing[pos]]
+                st.session_state[key] = explanation
+                slot.info(f"**AI Reasoning:**\n\n{explanation}")
+
+# Bulk catalog classification
+st.markdown("---")
+st.markdown("### Bulk Catalog Classification")
+st.caption("Upload a CSV or Excel product catalog to classify every SKU in a single run.")
+
+uploaded = st.file_uploader("Product catalog", type=["csv", "xlsx"], key="bulk_upload")
+
+if uploaded is not None:
+    try:
+        catalog = read_catalog(uploaded)
+    except Exception as e:
+        catalog = None
+        st.error(f"Could not read catalog: {str(e)}")
+
+    if catalog is not None:
+        st.caption(f"{len(catalog):,} rows loaded from {uploaded.name}")
+
+        b1, b2, b3, b4 = st.columns(4)
+        with b1:
+            desc_col = st.selectbox("Description column", options=list(catalog.columns))
+        with b2:
+            bulk_k = st.slider("Suggestions per SKU", min_value=1, max_value=5, value=3)
+        with b3:
+            bulk_workers = st.slider("Parallel workers", min_value=1, max_value=32, value=BULK_MAX_WORKERS)
+        with b4:
+            bulk_explain = st.checkbox("Explain top match", value=False, help="Adds one LLM call per SKU")
+
+        # Optional shipment columns for landed duty estimates
+        no_column = "(none)"
+        d1, d2 = st.columns(2)
+        with d1:
+            value_col = st.selectbox("Customs value column (USD)", options=[no_column] + list(catalog.columns))
+        with d2:
+            qty_col = st.selectbox(
+                "Quantity column",
+                options=[no_column] + list(catalog.columns),
+                help="In the unit of the specific duty rate (e.g. kg); needed for ¢/kg and compound rates",
+            )
+
+        if st.button("Classify Catalog", type="primary"):
+            descriptions = catalog[desc_col].fillna("").astype(str).tolist()
+            total = len(descriptions)
+            output_path = os.path.join(BULK_OUTPUT_DIR, f"hts_bulk_{int(time.time())}.csv")
+
+            progress = st.progress(0.0, text="Starting bulk classification...")
+            live_table = st.empty()
+            completed = []
+            start = time.time()
+
+            with BulkResultWriter(output_path) as writer:
+                for result in classify_catalog(descriptions, k=bulk_k, explain=bulk_explain, max_workers=bulk_workers):
+                    writer.write(result)
+                    completed.append(result)
+
+                    done = len(completed)
+                    rate = done / max(time.time() - start, 1e-6)
+                    progress.progress(done / total, text=f"{done:,}/{total:,} SKUs • {rate:.1f} SKUs/s")
+
+                    if done % 25 == 0 or done == total:
+                        live_table.dataframe(completed[-200:], use_container_width=True, hide_index=True)
+
+            elapsed = time.time() - start
+            st.session_state["bulk_output"] = output_path
+            st.session_state["bulk_summary"] = (
+                f"Classified {total:,} SKUs in {elapsed:.1f}s ({total / max(elapsed, 1e-6):.1f} SKUs/s), "
+                f"{sum(1 for r in completed if r['error']):,} errors"
+            )
+            st.session_state["bulk_duties"] = None
+
+            if value_col != no_column:
+                try:
+                    values = catalog[value_col]
+                    quantities = catalog[qty_col] if qty_col != no_column else None
+                    completed.sort(key=lambda r: r["row"])
+                    st.session_state["bulk_duties"] = price_results(completed, values, quantities)
+
+                    # Rewrite the results file with the duty columns
+                    with BulkResultWriter(output_path, fields=RESULT_FIELDS + DUTY_FIELDS) as writer:
+                        for result in completed:
+                            writer.write(result)
+                except Exception as e:
+                    st.warning(f"Duty estimate unavailable: {str(e)}")
+
+if st.session_state.get("bulk_output") and os.path.exists(st.session_state["bulk_output"]):
+    st.success(st.session_state["bulk_summary"])
+    duties = st.session_state.get("bulk_duties")
+    if duties:
+        m1, m2, m3, m4 = st.columns(4)
+        with m1: st.metric("Shipment Value", f"${duties['value']:,.0f}")
+        with m2: st.metric("Estimated Duty", f"${duties['duty']:,.0f}")
+        with m3: st.metric("Effective Rate", f"{duties['effective_rate']:.1%}")
+        with m4: st.metric("Lines Priced", f"{duties['priced']:,} / {duties['lines']:,}")
+    with open(st.session_state["bulk_output"], "rb") as f:
+        st.download_button(
+            "⬇️ Download Results (CSV)",
+            data=f.read(),
+            file_name=os.path.basename(st.session_state["bulk_output"]),
+            mime="text/csv",
+        )
 
 # Sidebar tips
 with st.sidebar:
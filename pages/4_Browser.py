@@ -1,8 +1,12 @@
 import streamlit as st
 import textwrap
-from utils.supabase_db import get_hts_page, count_hts_rows
+from utils.clients import get_supabase_client
+from utils.supabase_db import SUPABASE_TABLE, get_hts_page, get_hts_page_after, page_cursor, count_hts_rows
+from utils import snapshot
 from utils.ui import inject_global_css, page_header, glass_card, result_card
 from utils.duty_rates import get_duty_category
+from utils.hts_tree import get_hts_tree
+from components.hierarchy_viz import lazy_hierarchy_explorer
 
 st.set_page_config(
     page_title="HTS Browser - HTS Dashboard",
@@ -17,11 +21,27 @@ page_header(
     "Comprehensive access to the complete 2026 HTS dataset. Explore legal headers, duty rates, and technical specifications."
 )
 
+# Read from the local snapshot when one has been synced
+use_snapshot = snapshot.snapshot_available()
+
 # Get total count and calculate pages
-total = count_hts_rows()
+total = snapshot.count_rows() if use_snapshot else count_hts_rows()
 page_size = 20
 total_pages = (total // page_size) + 1
 
+# Start cursor of every page visited so far (page 1 starts at the beginning)
+if "browser_cursors" not in st.session_state:
+    st.session_state["browser_cursors"] = {1: None}
+
+# The page widget reads its value from session state, which the
+# Previous/Next callbacks also write, so it is seeded here instead of value=
+if "browser_page" not in st.session_state:
+    st.session_state["browser_page"] = 1
+
+
+def go_to_page(target: int) -> None:
+    st.session_state["browser_page"] = target
+
 # Page navigation
 col1, col2, col3 = st.columns([1, 2, 1])
 
@@ -33,7 +53,7 @@ with col2:
         "Page Number",
         min_value=1,
         max_value=total_pages,
-        value=1,
+        key="browser_page",
     )
 
 with col3:
@@ -41,16 +61,41 @@ with col3:
 
 st.markdown("---")
 
+# Hierarchy drill-down: loads one level at a time, so it is cheap to leave open
+if st.toggle("🌳 Browse by hierarchy", key="browser_hierarchy_open"):
+    lazy_hierarchy_explorer("browser_hierarchy")
+    st.markdown("---")
+
 # Fetch and display rows
-rows = get_hts_page(page=page, page_size=page_size)
+if use_snapshot:
+    rows = snapshot.get_page(page=page, page_size=page_size)
+else:
+    # Seek from a known cursor, fall back to OFFSET for direct jumps
+    cursors = st.session_state["browser_cursors"]
+    if page in cursors:
+        rows, next_cursor = get_hts_page_after(cursors[page], page_size=page_size)
+    else:
+        rows = get_hts_page(page=page, page_size=page_size)
+        next_cursor = page_cursor(rows, page_size)
+
+    if next_cursor is not None:
+        cursors[page + 1] = next_cursor
 
 st.markdown(f"## Page {page} of {total_pages}")
 st.markdown(f"Showing {len(rows)} HTS codes from the database")
 
+# Chapter/heading trail for each row, when the HTS tree has been built
+tree = get_hts_tree()
+
 # Display each row
 for idx, r in enumerate(rows):
     duty_category = get_duty_category(r['hts_code'])
     
+    if tree is not None:
+        trail = tree.breadcrumb(r['hts_code'], include_self=False)
+        if trail:
+            st.caption(" › ".join(trail))
+    
     result_card(
         hts_code=r['hts_code'],
         title=r['title'],
@@ -65,16 +110,14 @@ col_prev, col_info, col_next = st.columns([1, 2, 1])
 
 with col_prev:
     if page > 1:
-        if st.button("← Previous Page", use_container_width=True):
-            st.rerun()
+        st.button("← Previous Page", use_container_width=True, on_click=go_to_page, args=(page - 1,))
 
 with col_info:
     st.markdown(f"<p style='text-align: center;'>Page {page} of {total_pages} • {total:,} total codes</p>", unsafe_allow_html=True)
 
 with col_next:
     if page < total_pages:
-        if st.button("Next Page →", use_container_width=True):
-            st.rerun()
+        st.button("Next Page →", use_container_width=True, on_click=go_to_page, args=(page + 1,))
 
 # Sidebar
 with st.sidebar:
@@ -86,6 +129,23 @@ with st.sidebar:
     - Current View: Page {page}
     """)
     
+    st.markdown("---")
+    st.markdown("#### Local Snapshot")
+    if use_snapshot:
+        info = snapshot.snapshot_info()
+        st.caption(f"Version `{info.get('version')}` • synced {info.get('synced_at')}")
+    else:
+        st.caption("No local snapshot yet. Pages are loaded from Supabase.")
+
+    if st.button("🔄 Sync Snapshot", use_container_width=True):
+        with st.spinner("Downloading HTS table..."):
+            try:
+                snapshot.sync_snapshot(get_supabase_client(), SUPABASE_TABLE)
+                st.session_state["browser_cursors"] = {1: None}
+                st.rerun()
+            except Exception as e:
+                st.error(f"Snapshot sync failed: {str(e)}")
+
     st.markdown("---")
     st.markdown("#### Navigation Tips")
     st.markdown("""
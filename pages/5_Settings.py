@@ -76,6 +76,25 @@ with col2:
     3. Set them in your IDE configuration
     """)
 
+# Cache statistics
+st.markdown("### Cache Performance")
+
+try:
+    from utils.embeddings import get_embedding_cache
+    from utils.llm_explain import get_explanation_cache, get_variation_cache
+    caches = [get_embedding_cache(), get_variation_cache(), get_explanation_cache()]
+    cache_stats = [c.stats() for c in caches if c is not None]
+except Exception as e:
+    cache_stats = []
+    st.warning(f"Cache statistics unavailable: {e}")
+
+for stats in cache_stats:
+    c1, c2, c3, c4 = st.columns(4)
+    with c1: st.metric(f"{stats['namespace'].title()} Cache", f"{stats['entries']:,} / {stats['max_entries']:,}")
+    with c2: st.metric("Hits", f"{stats['hits']:,}")
+    with c3: st.metric("Misses", f"{stats['misses']:,}")
+    with c4: st.metric("Hit Rate", f"{stats['hit_rate']:.0%}")
+
 # System info
 st.markdown("### System Information")
 
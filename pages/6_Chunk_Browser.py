@@ -1,6 +1,7 @@
 import streamlit as st
 import textwrap
-from utils.supabase_db import supabase
+from utils.clients import get_supabase_client
+from utils import snapshot
 from utils.ui import inject_global_css, page_header
 
 st.set_page_config(
@@ -60,22 +61,43 @@ if search_button or 'chunks_loaded' not in st.session_state:
     
     with st.spinner("Loading chunks from database..."):
         try:
-            # Build query
-            query = supabase.table("hts_knowledge_chunks").select("*")
-            
-            # Apply filters
-            if search_query:
-                query = query.or_(f"hts_code.ilike.%{search_query}%,title.ilike.%{search_query}%,normalized_text.ilike.%{search_query}%")
-            
-            if hts_code_filter:
-                query = query.ilike("hts_code", f"%{hts_code_filter}%")
-            
-            if chapter_filter:
-                query = query.ilike("hts_code", f"{chapter_filter}%")
-            
-            # Execute query
-            response = query.limit(limit).execute()
-            chunks = response.data
+            if snapshot.snapshot_available():
+                chunks = snapshot.search_rows(
+                    text=search_query,
+                    code_prefix=hts_code_filter,
+                    chapter=chapter_filter,
+                    limit=limit,
+                )
+            else:
+                supabase = get_supabase_client()
+
+                # Build query (never select the embedding column itself)
+                query = supabase.table("hts_knowledge_chunks").select("id, hts_code, title, normalized_text")
+
+                # Apply filters
+                if search_query:
+                    query = query.or_(f"hts_code.ilike.%{search_query}%,title.ilike.%{search_query}%,normalized_text.ilike.%{search_query}%")
+
+                if hts_code_filter:
+                    query = query.ilike("hts_code", f"%{hts_code_filter}%")
+
+                if chapter_filter:
+                    query = query.ilike("hts_code", f"{chapter_filter}%")
+
+                # Execute query
+                response = query.limit(limit).execute()
+                chunks = response.data
+
+                # Flag rows without embeddings using a small id-only lookup
+                if chunks:
+                    missing = supabase.table("hts_knowledge_chunks")\
+                        .select("id")\
+                        .in_("id", [c["id"] for c in chunks])\
+                        .is_("embedding", "null")\
+                        .execute().data or []
+                    missing_ids = {m["id"] for m in missing}
+                    for c in chunks:
+                        c["has_embedding"] = c["id"] not in missing_ids
             
             if not chunks:
                 st.warning("No chunks found matching your criteria.")
@@ -101,7 +123,7 @@ if search_button or 'chunks_loaded' not in st.session_state:
                             st.markdown("**Metadata**")
                             st.json({
                                 "id": chunk.get('id'),
-                                "embedding": "✅ 1536-dim" if chunk.get('embedding') else "❌ Missing"
+                                "embedding": "✅ Embedded" if chunk.get('has_embedding') else "❌ Missing"
                             })
                         
                         # Action buttons
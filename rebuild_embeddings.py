@@ -1,5 +1,6 @@
 import os
 import time
+import argparse
 import numpy as np
 from tqdm import tqdm
 from supabase import create_client
@@ -7,6 +8,9 @@ from openai import OpenAI
 
 from dotenv import load_dotenv
 
+from utils.hts_source import content_hash
+from utils.retry import RetryPolicy, retry_call
+
 # -------------------------------
 #  CONFIG
 # -------------------------------
@@ -19,6 +23,7 @@ TABLE_NAME = os.getenv("SUPABASE_TABLE", "hts_knowledge_chunks")
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
 EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "1536"))
 BATCH_SIZE = 50  # number of rows to update per batch
+RETRY_POLICY = RetryPolicy(max_attempts=5, base_delay=1.0, max_delay=30.0)
 
 if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY or not OPENAI_API_KEY:
     raise RuntimeError("Set SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY, OPENAI_API_KEY env vars before running.")
@@ -45,18 +50,43 @@ def fetch_total_rows():
     return resp.count
 
 
-def fetch_batch(offset, limit):
+def fetch_batch(after_id, limit):
     """
-    Returns list of rows with fields: id, normalized_text
+    Returns up to `limit` rows with id > after_id (fields: id, normalized_text).
+
+    Seeking on the primary key keeps every page equally cheap and never skips
+    or repeats rows if the table changes mid-run.
     """
     resp = (
         supabase.table(TABLE_NAME)
         .select("id, normalized_text")
+        .gt("id", after_id)
         .order("id", desc=False)
-        .range(offset, offset + limit - 1)
+        .limit(limit)
         .execute()
     )
-    return resp.data
+    return resp.data or []
+
+
+def fetch_stale_batch(after_id, limit):
+    """
+    Returns rows (id, normalized_text) with id > after_id whose embedding is
+    missing or whose content_hash no longer matches text + model.
+    """
+    resp = supabase.rpc(
+        "stale_hts_chunks",
+        {
+            "after_id": after_id,
+            "embedding_model": EMBEDDING_MODEL,
+            "page_size": limit,
+        },
+    ).execute()
+    return resp.data or []
+
+
+def count_stale_rows():
+    resp = supabase.rpc("count_stale_hts_chunks", {"embedding_model": EMBEDDING_MODEL}).execute()
+    return resp.data[0]
 
 
 def embed_texts(texts):
@@ -70,60 +100,112 @@ def embed_texts(texts):
     return [item.embedding for item in resp.data]
 
 
-def main():
+def embed_and_update(rows, label):
+    """Embed a batch of rows and write embedding + content_hash back."""
+    texts = [row["normalized_text"] or "" for row in rows]
+    ids = [row["id"] for row in rows]
+
+    try:
+        raw_embeddings = retry_call(embed_texts, texts, policy=RETRY_POLICY, label=f"embed {label}")
+    except Exception as e:
+        # Rows keep their stale hash, so --incremental picks them up later
+        print(f"\n❌ Embedding API error at batch {label}: {e}")
+        return
+
+    updates = []
+    for rid, text, emb in zip(ids, texts, raw_embeddings):
+        emb_norm = normalize(emb)
+        if len(emb_norm) != EMBEDDING_DIM:
+            print(
+                f"⚠️ Dimension mismatch for id {rid}: "
+                f"got {len(emb_norm)}, expected {EMBEDDING_DIM}"
+            )
+        updates.append(
+            {
+                "id": rid,
+                "embedding": emb_norm,
+                "content_hash": content_hash(text, EMBEDDING_MODEL),
+            }
+        )
+
+    # Bulk update (Supabase client handles batch upserts/updates)
+    try:
+        retry_call(
+            lambda: supabase.table(TABLE_NAME).upsert(updates).execute(),
+            policy=RETRY_POLICY,
+            label=f"update {label}",
+        )
+    except Exception as e:
+        print(f"\n❌ Bulk update error for batch {label}: {e}")
+        # Fallback to individual updates if bulk fails
+        for row in updates:
+            try:
+                supabase.table(TABLE_NAME).update(
+                    {"embedding": row["embedding"], "content_hash": row["content_hash"]}
+                ).eq("id", row["id"]).execute()
+            except Exception as e:
+                print(f"❌ Individual update error for id {row['id']}: {e}")
+            time.sleep(1)
+
+    # small sleep to avoid hammering the DB
+    time.sleep(0.1)
+
+
+def rebuild_all():
     total = fetch_total_rows()
     print(f"Found {total} rows in {TABLE_NAME} to (re)embed.")
 
-    num_batches = (total + BATCH_SIZE - 1) // BATCH_SIZE
-
-    for batch_idx in tqdm(range(num_batches), desc="Rebuilding embeddings"):
-        offset = batch_idx * BATCH_SIZE
-        rows = fetch_batch(offset, BATCH_SIZE)
-        if not rows:
-            continue
-
-        texts = [row["normalized_text"] or "" for row in rows]
-        ids = [row["id"] for row in rows]
-
-        try:
-            raw_embeddings = embed_texts(texts)
-        except Exception as e:
-            print(f"\n❌ Embedding API error at batch {batch_idx}: {e}")
-            time.sleep(3)
-            continue
-
-        updates = []
-        for rid, emb in zip(ids, raw_embeddings):
-            emb_norm = normalize(emb)
-            if len(emb_norm) != EMBEDDING_DIM:
-                print(
-                    f"⚠️ Dimension mismatch for id {rid}: "
-                    f"got {len(emb_norm)}, expected {EMBEDDING_DIM}"
-                )
-            updates.append(
-                {
-                    "id": rid,
-                    "embedding": emb_norm,
-                }
-            )
+    with tqdm(total=total, desc="Rebuilding embeddings") as bar:
+        after_id = 0
+        while True:
+            rows = fetch_batch(after_id, BATCH_SIZE)
+            if not rows:
+                break
+            embed_and_update(rows, f"after id {after_id}")
+            after_id = rows[-1]["id"]
+            bar.update(len(rows))
+
+
+def rebuild_incremental():
+    stale = count_stale_rows()
+    print(
+        f"{stale['missing_embedding'] + stale['changed']} of {stale['total']} rows need embedding "
+        f"({stale['missing_embedding']} missing, {stale['changed']} changed text or model)."
+    )
 
-        # Bulk update (Supabase client handles batch upserts/updates)
-        try:
-            supabase.table(TABLE_NAME).upsert(updates).execute()
-        except Exception as e:
-            print(f"\n❌ Bulk update error for batch {batch_idx}: {e}")
-            # Fallback to individual updates if bulk fails
-            for row in updates:
-                try:
-                    supabase.table(TABLE_NAME).update(
-                        {"embedding": row["embedding"]}
-                    ).eq("id", row["id"]).execute()
-                except Exception as e:
-                    print(f"❌ Individual update error for id {row['id']}: {e}")
-                time.sleep(1)
-
-        # small sleep to avoid hammering the DB
-        time.sleep(0.1)
+    with tqdm(total=stale["missing_embedding"] + stale["changed"], desc="Re-embedding changed rows") as bar:
+        after_id = 0
+        while True:
+            rows = fetch_stale_batch(after_id, BATCH_SIZE)
+            if not rows:
+                break
+            embed_and_update(rows, f"after id {after_id}")
+            # Rows that fail to embed keep their stale hash; move past them
+            after_id = rows[-1]["id"]
+            bar.update(len(rows))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-embed rows in the HTS knowledge base.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only re-embed rows whose text/model hash changed or whose embedding is NULL")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Report how many rows would be re-embedded and exit")
+    args = parser.parse_args()
+
+    if args.dry_run:
+        stale = count_stale_rows()
+        print(f"Model: {EMBEDDING_MODEL}")
+        print(f"Rows in {TABLE_NAME}: {stale['total']}")
+        print(f"  missing embedding:      {stale['missing_embedding']}")
+        print(f"  changed text or model:  {stale['changed']}")
+        print(f"  would be re-embedded:   {stale['missing_embedding'] + stale['changed']}")
+        return
+
+    if args.incremental:
+        rebuild_incremental()
+    else:
+        rebuild_all()
 
     print("\n✅ Finished rebuilding embeddings.")
 
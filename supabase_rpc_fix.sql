@@ -6,8 +6,10 @@
 --
 -- CRITICAL: The Supabase Python client passes parameters in ALPHABETICAL order.
 -- Therefore, the function signature MUST have parameters alphabetically ordered:
---   1. match_count (comes before 'q' alphabetically)
---   2. query_embedding (comes after 'm' alphabetically)
+--   1. code_prefix (optional filter)
+--   2. match_count
+--   3. min_similarity (optional filter)
+--   4. query_embedding
 --
 -- Run this in your Supabase SQL Editor to ensure the function exists with
 -- the correct signature.
@@ -19,15 +21,81 @@ CREATE EXTENSION IF NOT EXISTS vector;
 -- Drop existing function if it exists (to recreate with correct signature)
 DROP FUNCTION IF EXISTS public.match_hts_chunks(vector, int);
 DROP FUNCTION IF EXISTS public.match_hts_chunks(int, vector);
+DROP FUNCTION IF EXISTS public.match_hts_chunks(text, int, float, vector);
 
 -- Optional: Drop and recreate index to ensure it's clean (run separately if needed)
 -- DROP INDEX IF EXISTS hts_knowledge_chunks_embedding_idx;
 
 -- Create the function with ALPHABETICALLY ORDERED parameters
 -- This matches how the Supabase Python client will call it
+--
+-- Postgres requires every parameter after a defaulted one to have a default,
+-- so all four are optional; callers that only pass match_count and
+-- query_embedding keep working.
+--
+-- The embedding column is deliberately NOT returned: at match_count = 20 it
+-- was most of the response bytes and JSON parse time, and no page uses it.
+-- Use match_hts_chunks_full below if you need the vectors.
+--
+-- Optional filters are applied inside the index scan:
+--   code_prefix     dotted HTS prefix, e.g. '39' or '3923.30'
+--   min_similarity  drop matches below this cosine similarity
+-- On pgvector >= 0.8 the HNSW scan is switched to iterative mode so it keeps
+-- walking the graph until match_count rows pass the filters (older versions
+-- silently ignore the setting and may return fewer rows).
 CREATE OR REPLACE FUNCTION public.match_hts_chunks(
-  match_count int,           -- First parameter (alphabetically)
-  query_embedding vector(1536) -- Second parameter (adjust dimension if needed)
+  code_prefix text DEFAULT NULL,      -- 1st (alphabetically)
+  match_count int DEFAULT 10,         -- 2nd
+  min_similarity float DEFAULT NULL,  -- 3rd
+  query_embedding vector(1536) DEFAULT NULL -- 4th (adjust dimension if needed)
+)
+RETURNS TABLE (
+  id bigint,
+  hts_code text,
+  title text,
+  normalized_text text,
+  similarity float
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  BEGIN
+    PERFORM set_config('hnsw.iterative_scan', 'relaxed_order', true);
+  EXCEPTION WHEN OTHERS THEN
+    NULL;
+  END;
+
+  RETURN QUERY
+  SELECT m.id, m.hts_code, m.title, m.normalized_text, m.similarity
+  FROM (
+    SELECT
+      c.id,
+      c.hts_code,
+      c.title,
+      c.normalized_text,
+      1 - (c.embedding <=> query_embedding) AS similarity
+    FROM hts_knowledge_chunks c
+    WHERE (match_hts_chunks.code_prefix IS NULL OR c.hts_code LIKE match_hts_chunks.code_prefix || '%')
+      AND (match_hts_chunks.min_similarity IS NULL
+           OR c.embedding <=> query_embedding <= 1 - match_hts_chunks.min_similarity)
+    ORDER BY c.embedding <=> query_embedding
+    LIMIT match_count
+  ) m
+  -- relaxed_order can return neighbours slightly out of order
+  ORDER BY m.similarity DESC;
+END;
+$$;
+
+-- Supports the code_prefix filter (LIKE 'prefix%')
+CREATE INDEX IF NOT EXISTS hts_knowledge_chunks_code_pattern_idx
+  ON hts_knowledge_chunks (hts_code text_pattern_ops);
+
+-- Same search, but also returns the embedding (debugging / bench_rpc_payload.py)
+DROP FUNCTION IF EXISTS public.match_hts_chunks_full(int, vector);
+
+CREATE OR REPLACE FUNCTION public.match_hts_chunks_full(
+  match_count int,
+  query_embedding vector(1536)
 )
 RETURNS TABLE (
   id bigint,
@@ -55,8 +123,115 @@ END;
 $$;
 
 -- Grant execute permissions to authenticated and anon users
-GRANT EXECUTE ON FUNCTION public.match_hts_chunks(int, vector) TO authenticated;
-GRANT EXECUTE ON FUNCTION public.match_hts_chunks(int, vector) TO anon;
+GRANT EXECUTE ON FUNCTION public.match_hts_chunks(text, int, float, vector) TO authenticated;
+GRANT EXECUTE ON FUNCTION public.match_hts_chunks(text, int, float, vector) TO anon;
+GRANT EXECUTE ON FUNCTION public.match_hts_chunks_full(int, vector) TO authenticated;
+GRANT EXECUTE ON FUNCTION public.match_hts_chunks_full(int, vector) TO anon;
+
+-- ============================================================================
+-- Ingestion Upsert Key
+-- ============================================================================
+-- ingest_hts_kb.py upserts rows on source_ref: the HTS number for numbered
+-- rows, or "<preceding HTS number>~<hash>" for un-numbered description rows
+-- (hts_code alone is not unique because those rows have no code).
+
+ALTER TABLE hts_knowledge_chunks ADD COLUMN IF NOT EXISTS source_type text;
+ALTER TABLE hts_knowledge_chunks ADD COLUMN IF NOT EXISTS source_ref text;
+
+-- Tables built by make_hts_kb_fast.py stored source_ref = hts_code, which is
+-- '' for every un-numbered description row, so those rows share one key and
+-- the unique index below cannot be built. Numbered rows already carry the
+-- new key (their HTS number) and are kept with their embeddings; the
+-- un-numbered and duplicate rows are removed here.
+--
+-- REQUIRED after running this script on such a table: run
+-- `python ingest_hts_kb.py --json <hts json> --restart` to re-insert the removed rows
+-- under their "<HTS number>~<hash>" keys.
+DO $$
+DECLARE
+  removed bigint;
+BEGIN
+  DELETE FROM hts_knowledge_chunks
+  WHERE id IN (
+    SELECT k.id
+    FROM (
+      SELECT id, source_ref,
+             row_number() OVER (PARTITION BY source_ref ORDER BY id) AS copy
+      FROM hts_knowledge_chunks
+    ) k
+    WHERE k.source_ref IS NULL OR k.source_ref = '' OR k.copy > 1
+  );
+  GET DIAGNOSTICS removed = ROW_COUNT;
+  IF removed > 0 THEN
+    RAISE NOTICE 'Removed % rows without a unique source_ref; run ingest_hts_kb.py --restart to restore them', removed;
+  END IF;
+END;
+$$;
+
+CREATE UNIQUE INDEX IF NOT EXISTS hts_knowledge_chunks_source_ref_key
+  ON hts_knowledge_chunks (source_ref);
+
+-- ============================================================================
+-- Incremental Re-embedding
+-- ============================================================================
+-- content_hash = sha256('<model>:<normalized_text>') of the text and model
+-- the stored embedding was built from. rebuild_embeddings.py --incremental
+-- only fetches rows whose hash no longer matches or whose embedding is NULL.
+
+ALTER TABLE hts_knowledge_chunks ADD COLUMN IF NOT EXISTS content_hash text;
+
+CREATE OR REPLACE FUNCTION public.stale_hts_chunks(
+  after_id bigint,
+  embedding_model text,
+  page_size int
+)
+RETURNS TABLE (
+  id bigint,
+  normalized_text text
+)
+LANGUAGE sql STABLE
+AS $$
+  SELECT c.id, c.normalized_text
+  FROM hts_knowledge_chunks c
+  WHERE c.id > after_id
+    AND (
+      c.embedding IS NULL
+      OR c.content_hash IS DISTINCT FROM
+         encode(sha256(convert_to(embedding_model || ':' || coalesce(c.normalized_text, ''), 'UTF8')), 'hex')
+    )
+  ORDER BY c.id
+  LIMIT page_size;
+$$;
+
+CREATE OR REPLACE FUNCTION public.count_stale_hts_chunks(
+  embedding_model text
+)
+RETURNS TABLE (
+  total bigint,
+  missing_embedding bigint,
+  changed bigint
+)
+LANGUAGE sql STABLE
+AS $$
+  SELECT
+    count(*),
+    count(*) FILTER (WHERE c.embedding IS NULL),
+    count(*) FILTER (
+      WHERE c.embedding IS NOT NULL
+        AND c.content_hash IS DISTINCT FROM
+            encode(sha256(convert_to(embedding_model || ':' || coalesce(c.normalized_text, ''), 'UTF8')), 'hex')
+    )
+  FROM hts_knowledge_chunks c;
+$$;
+
+-- ============================================================================
+-- Keyset Pagination
+-- ============================================================================
+-- The Browser pages seek on (hts_code, id) instead of using OFFSET; this
+-- index lets every page start directly at the cursor position.
+
+CREATE INDEX IF NOT EXISTS hts_knowledge_chunks_code_id_idx
+  ON hts_knowledge_chunks (hts_code, id);
 
 -- ============================================================================
 -- Verification Queries
@@ -75,8 +250,8 @@ WHERE n.nspname = 'public'
 -- 2. Test the function with a dummy vector (adjust dimension as needed)
 -- This should return results if you have data in hts_knowledge_chunks
 -- SELECT * FROM public.match_hts_chunks(
---   5,  -- match_count
---   (SELECT embedding FROM hts_knowledge_chunks WHERE embedding IS NOT NULL LIMIT 1)
+--   match_count => 5,
+--   query_embedding => (SELECT embedding FROM hts_knowledge_chunks WHERE embedding IS NOT NULL LIMIT 1)
 -- );
 
 -- 3. Cleanup & Re-indexing (RUN THESE IF REBUILDING FROM SCRATCH)
@@ -93,7 +268,7 @@ WHERE n.nspname = 'public'
 -- ============================================================================
 -- 
 -- If you're using a different embedding dimension (e.g., 3072 for text-embedding-3-large),
--- update both occurrences of vector(1536) to vector(YOUR_DIMENSION).
+-- update every occurrence of vector(1536) to vector(YOUR_DIMENSION).
 --
 -- Common OpenAI embedding dimensions:
 -- - text-embedding-ada-002: 1536
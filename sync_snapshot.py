@@ -0,0 +1,28 @@
+import os
+from supabase import create_client
+from dotenv import load_dotenv
+
+from utils.snapshot import sync_snapshot, SNAPSHOT_PATH
+
+# -------------------------------
+#  CONFIG
+# -------------------------------
+load_dotenv(".hts_dashboard/.env")
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+TABLE_NAME = os.getenv("SUPABASE_TABLE", "hts_knowledge_chunks")
+
+if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
+    raise RuntimeError("Set SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY env vars before running.")
+
+
+def main():
+    supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+
+    print(f"📥 Syncing {TABLE_NAME} to {SNAPSHOT_PATH}...")
+    meta = sync_snapshot(supabase, TABLE_NAME, SNAPSHOT_PATH)
+    print(f"Version: {meta['version']} | Rows: {meta['row_count']} | Synced: {meta['synced_at']}")
+
+
+if __name__ == "__main__":
+    main()
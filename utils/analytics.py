@@ -1,12 +1,48 @@
+import time
 import streamlit as st
 from datetime import datetime
 
-def log_search(query, results):
+from utils.telemetry import get_telemetry
+
+
+def log_search(query, results, latency_ms=None, trace=None, kind="search", error=None):
+    """
+    Record a search in this session's history and in the telemetry log.
+
+    Args:
+        query: The search text
+        results: Result dicts as returned by semantic_search_hts
+        latency_ms: End-to-end time the user waited
+        trace: The `trace` dict filled by semantic_search_hts
+        kind: "search" or "classify"
+        error: Error message when the search failed
+    """
     if "history" not in st.session_state:
         st.session_state["history"] = []
 
+    codes = [r.get("hts_code") for r in results if r.get("hts_code")]
+
     st.session_state["history"].append({
         "time": datetime.utcnow().isoformat(timespec="seconds"),
         "query": query,
-        "top_results": ", ".join(r.get("hts_code") for r in results),
+        "top_results": ", ".join(codes),
+    })
+
+    sink = get_telemetry()
+    if sink is None:
+        return
+
+    trace = trace or {}
+    similarities = [r["similarity"] for r in results if r.get("similarity") is not None]
+    sink.record({
+        "ts": time.time(),
+        "kind": kind,
+        "query": query,
+        "latency_ms": latency_ms,
+        "stages": trace.get("stages"),
+        "result_codes": codes,
+        "result_count": len(results),
+        "top_similarity": max(similarities) if similarities else None,
+        "cache_hit": trace.get("cache_hit"),
+        "error": error,
     })
@@ -0,0 +1,218 @@
+"""
+HTS Dashboard - Async Search Pipeline
+
+An asyncio version of semantic_search_hts. Independent stages (exact-code
+lookup, keyword lookup, embedding cache lookup and the OpenAI embedding
+call) are started together, so a search takes about as long as its slowest
+stage instead of the sum of all of them.
+
+Everything runs on one long-lived event loop in a background thread, which
+keeps the async OpenAI and PostgREST connection pools warm between Streamlit
+reruns. Pages call the sync wrapper utils.search.semantic_search_hts.
+"""
+
+import asyncio
+import threading
+
+from utils.clients import get_async_rest_client
+from utils.embeddings import embed_text_async, embed_texts_async
+from utils.llm_explain import generate_search_variations_async
+from utils.retry import CircuitOpenError, is_retryable, retry_call_async
+from utils.telemetry import timed
+from utils.search import (
+    SEARCH_BACKEND,
+    SEARCH_MODE,
+    SEARCH_EXPANSION,
+    SEARCH_EXPANSION_VARIATIONS,
+    SEARCH_RETRY_ATTEMPTS,
+    SUPABASE_MATCH_RPC,
+    RPCError,
+    dotted_prefix,
+    exact_code_search,
+    get_local_index,
+    keyword_search,
+    needs_expansion,
+    reciprocal_rank_fusion,
+    rpc_breaker,
+    rpc_config_error,
+    rpc_params,
+    rpc_unavailable,
+    search_retry_policy,
+)
+from utils import snapshot
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _event_loop() -> asyncio.AbstractEventLoop:
+    """Start the shared background event loop on first use."""
+    global _loop
+
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="hts-async", daemon=True).start()
+            _loop = loop
+    return _loop
+
+
+def run_sync(coro, timeout=None):
+    """Run `coro` on the shared loop and block until it finishes."""
+    return asyncio.run_coroutine_threadsafe(coro, _event_loop()).result(timeout)
+
+
+async def semantic_query_async(vector, limit=5, max_retries=SEARCH_RETRY_ATTEMPTS, code_prefix=None, min_similarity=None):
+    """
+    Async version of utils.search.semantic_query over the PostgREST RPC
+    endpoint. Backoff waits with asyncio.sleep, so other searches keep
+    running, and an attempt still in flight at the deadline is cancelled.
+    """
+    client = get_async_rest_client()
+    if client is None:
+        raise Exception("Supabase client not initialized. Check your environment variables.")
+
+    params = rpc_params(vector, limit, code_prefix, min_similarity)
+
+    async def call():
+        response = await client.post(f"/rpc/{SUPABASE_MATCH_RPC}", json=params)
+        if response.is_error:
+            raise RPCError(response.status_code, response.text)
+        return response.json() or []
+
+    try:
+        return await retry_call_async(
+            call,
+            policy=search_retry_policy(max_retries),
+            label="RPC search",
+            retryable=lambda e: rpc_config_error(e, vector) is None and is_retryable(e),
+        )
+    except Exception as e:
+        config_error = rpc_config_error(e, vector)
+        if config_error:
+            raise config_error from e
+        print(f"❌ RPC search failed: {str(e)}")
+        raise
+
+
+async def vector_search_async(vector, limit=5, code_prefix=None, min_similarity=None):
+    """Async version of utils.search.vector_search, with the same fallback."""
+    if SEARCH_BACKEND != "local":
+        try:
+            rpc_breaker.check()
+            hits = await semantic_query_async(vector, limit, code_prefix=code_prefix, min_similarity=min_similarity)
+        except Exception as e:
+            if not rpc_unavailable(e):
+                if not isinstance(e, CircuitOpenError) and not is_retryable(e):
+                    # The backend answered (e.g. a bad request), so it is not down
+                    rpc_breaker.record_success()
+                raise
+        else:
+            rpc_breaker.record_success()
+            return hits
+
+    index = await asyncio.to_thread(get_local_index)
+    return await asyncio.to_thread(
+        index.search, vector, limit, code_prefix=code_prefix, min_similarity=min_similarity
+    )
+
+
+async def _timed(trace, stage, awaitable):
+    with timed(trace, stage):
+        return await awaitable
+
+
+async def _embed_and_search(query, limit, code_prefix, min_similarity, trace=None):
+    with timed(trace, "embed"):
+        vector = await embed_text_async(query, trace)
+    with timed(trace, "vector"):
+        return await vector_search_async(vector, limit, code_prefix=code_prefix, min_similarity=min_similarity)
+
+
+async def expanded_vector_search_async(query, limit, code_prefix, min_similarity, variations_task=None):
+    """
+    Async version of utils.search.expanded_vector_search. `variations_task`
+    is an already started variation request to reuse.
+    """
+    variations_task = variations_task or generate_search_variations_async(query, SEARCH_EXPANSION_VARIATIONS)
+    variations = [v for v in await variations_task if v != query]
+    if not variations:
+        return []
+
+    vectors = await embed_texts_async(variations)
+    results = await asyncio.gather(
+        *(vector_search_async(vector, limit, code_prefix, min_similarity) for vector in vectors),
+        return_exceptions=True,
+    )
+
+    result_lists = []
+    for result in results:
+        if isinstance(result, Exception):
+            print(f"⚠️ Expanded search failed: {str(result)}")
+        else:
+            result_lists.append(result)
+    return result_lists
+
+
+async def semantic_search_async(query, limit=5, mode=None, code_prefix=None, min_similarity=None, expand=None,
+                                trace=None):
+    """
+    Async version of utils.search.semantic_search_hts, with the same
+    arguments and result shape.
+
+    Code-like queries are looked up by HTS number before anything else
+    starts (in the local snapshot when there is one, otherwise over the
+    network), so a code hit never pays for an embedding. In hybrid mode
+    the keyword lookup runs alongside the embedding and vector search. With
+    expand="always" the query variations are requested up front as well;
+    otherwise they are only generated once the vector results turn out
+    weak. Stages that run concurrently each record their own time in
+    `trace`.
+    """
+    mode = (mode or SEARCH_MODE).lower()
+    if code_prefix:
+        code_prefix = dotted_prefix(snapshot.code_digits(code_prefix)) or None
+
+    if snapshot.looks_like_code(query):
+        if snapshot.snapshot_available():
+            with timed(trace, "code"):
+                hits = exact_code_search(query, limit, code_prefix=code_prefix)
+        else:
+            hits = await _timed(trace, "code", asyncio.to_thread(exact_code_search, query, limit, code_prefix))
+        if hits:
+            return hits
+
+    # Fetch deeper candidate lists so fusion has something to work with
+    depth = max(limit * 2, 10) if mode == "hybrid" else limit
+
+    tasks = {
+        "vector": asyncio.create_task(_embed_and_search(query, depth, code_prefix, min_similarity, trace)),
+    }
+    if mode == "hybrid":
+        tasks["keyword"] = asyncio.create_task(
+            _timed(trace, "keyword", asyncio.to_thread(keyword_search, query, depth, code_prefix))
+        )
+    if (expand or SEARCH_EXPANSION).lower() == "always":
+        tasks["variations"] = asyncio.create_task(
+            generate_search_variations_async(query, SEARCH_EXPANSION_VARIATIONS)
+        )
+
+    try:
+        vector_hits = await tasks["vector"]
+
+        result_lists = [vector_hits]
+        if needs_expansion(vector_hits, expand):
+            with timed(trace, "expansion"):
+                result_lists += await expanded_vector_search_async(
+                    query, depth, code_prefix, min_similarity, tasks.get("variations")
+                )
+
+        if "keyword" in tasks:
+            result_lists.append(await tasks["keyword"])
+
+        if len(result_lists) == 1:
+            return vector_hits
+        return reciprocal_rank_fusion(result_lists, limit, min_similarity=min_similarity)
+    finally:
+        for task in tasks.values():
+            task.cancel()
@@ -0,0 +1,204 @@
+"""
+HTS Dashboard - Bulk Catalog Classification
+
+This module classifies whole product catalogs. Descriptions are embedded in
+batches, the top-k searches (and optional explanations) run on a bounded
+thread pool, and results are yielded as soon as each SKU completes.
+"""
+
+import os
+import csv
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Iterator
+
+from utils.embeddings import embed_texts
+from utils.search import vector_search
+from utils.llm_explain import explain_classification
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+BULK_MAX_WORKERS = int(os.environ.get("BULK_MAX_WORKERS", "8"))
+BULK_EMBED_BATCH = int(os.environ.get("BULK_EMBED_BATCH", "256"))
+BULK_OUTPUT_DIR = os.environ.get("BULK_OUTPUT_DIR", ".hts_cache/bulk")
+
+RESULT_FIELDS = [
+    "row",
+    "description",
+    "hts_code",
+    "title",
+    "similarity",
+    "alternatives",
+    "explanation",
+    "error",
+]
+
+# Extra columns written when a shipment is priced with price_results()
+DUTY_FIELDS = ["general_rate", "estimated_duty"]
+
+
+def read_catalog(uploaded_file) -> "pd.DataFrame":
+    """Read an uploaded CSV or Excel file into a DataFrame."""
+    import pandas as pd
+
+    name = getattr(uploaded_file, "name", "").lower()
+    if name.endswith((".xlsx", ".xls")):
+        return pd.read_excel(uploaded_file)
+    return pd.read_csv(uploaded_file)
+
+
+def _empty_result(row: int, description: str, error: str) -> dict:
+    result = {field: "" for field in RESULT_FIELDS}
+    result.update(row=row, description=description, error=error)
+    return result
+
+
+def _classify_one(row: int, description: str, vector, k: int, explain: bool) -> dict:
+    result = _empty_result(row, description, "")
+
+    try:
+        matches = vector_search(vector, k)
+        if matches:
+            top = matches[0]
+            result["hts_code"] = top["hts_code"]
+            result["title"] = top["title"]
+            result["similarity"] = round(float(top.get("similarity", 0.0)), 4)
+            result["alternatives"] = "; ".join(m["hts_code"] for m in matches[1:])
+
+            if explain:
+                result["explanation"] = explain_classification(
+                    product_description=description,
+                    hts_code=top["hts_code"],
+                    hts_title=top["title"],
+                    context=top.get("normalized_text", ""),
+                )
+    except Exception as e:
+        result["error"] = str(e)
+
+    return result
+
+
+def classify_catalog(
+    descriptions: list[str],
+    k: int = 3,
+    explain: bool = False,
+    max_workers: int = BULK_MAX_WORKERS,
+    batch_size: int = BULK_EMBED_BATCH,
+) -> Iterator[dict]:
+    """
+    Classify many product descriptions, yielding one result dict per SKU in
+    completion order.
+
+    Each batch is embedded with a single API call. While its searches run on
+    the worker pool, the next batch is already being embedded.
+    """
+    items = []
+    for row, description in enumerate(descriptions):
+        if description.strip():
+            items.append((row, description))
+        else:
+            yield _empty_result(row, description, "Empty description")
+
+    batches = [items[start:start + batch_size] for start in range(0, len(items), batch_size)]
+    if not batches:
+        return
+
+    # Catalog descriptions are one-off; keep them out of the query cache
+    def embed_batch(batch):
+        return embed_texts([description for _, description in batch], cache=False)
+
+    with ThreadPoolExecutor(max_workers=1) as embedder, ThreadPoolExecutor(max_workers=max_workers) as workers:
+        next_vectors = embedder.submit(embed_batch, batches[0])
+
+        for i, batch in enumerate(batches):
+            try:
+                vectors, error = next_vectors.result(), None
+            except Exception as e:
+                vectors, error = None, str(e)
+
+            if i + 1 < len(batches):
+                next_vectors = embedder.submit(embed_batch, batches[i + 1])
+
+            if vectors is None:
+                for row, description in batch:
+                    yield _empty_result(row, description, f"Embedding failed: {error}")
+                continue
+
+            futures = [
+                workers.submit(_classify_one, row, description, vector, k, explain)
+                for (row, description), vector in zip(batch, vectors)
+            ]
+            for future in as_completed(futures):
+                yield future.result()
+
+
+def price_results(results: list[dict], values, quantities=None) -> dict:
+    """
+    Estimate duties for a whole classified shipment in one vectorized call.
+
+    `values` and `quantities` are catalog columns indexed by each result's
+    `row`; non-numeric cells count as missing. Adds `general_rate` and `estimated_duty` to every result (blank when a
+    line cannot be priced) and returns shipment totals.
+    """
+    import numpy as np
+    import pandas as pd
+
+    from utils.duty_rates import estimate_landed_duty
+    from utils.duty_table import get_duty_table
+
+    rows = [r["row"] for r in results]
+    codes = [r["hts_code"] or "" for r in results]
+    line_values = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=np.float64)[rows]
+    line_quantities = None
+    if quantities is not None:
+        line_quantities = pd.to_numeric(pd.Series(quantities), errors="coerce").to_numpy(dtype=np.float64)[rows]
+
+    duties = estimate_landed_duty(codes, line_values, line_quantities)
+    table = get_duty_table()
+
+    priced = ~np.isnan(duties)
+    for result, code, duty, ok in zip(results, codes, duties.tolist(), priced.tolist()):
+        result["general_rate"] = (table.general_rate(code) or "") if code else ""
+        result["estimated_duty"] = round(duty, 2) if ok else ""
+
+    total_value = float(np.nansum(line_values[priced]))
+    total_duty = float(duties[priced].sum())
+    return {
+        "lines": len(results),
+        "priced": int(priced.sum()),
+        "value": total_value,
+        "duty": total_duty,
+        "effective_rate": total_duty / total_value if total_value else 0.0,
+    }
+
+
+class BulkResultWriter:
+    """Append classification results to a CSV file as they arrive."""
+
+    def __init__(self, path: str, fields: list[str] = RESULT_FIELDS):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.count = 0
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=fields)
+        self._writer.writeheader()
+
+    def write(self, result: dict) -> None:
+        self._writer.writerow(result)
+        self.count += 1
+        # Flush periodically so a partial file is usable if the run stops
+        if self.count % 50 == 0:
+            self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
@@ -0,0 +1,174 @@
+"""
+HTS Dashboard - Shared API Clients
+
+One Supabase client and one OpenAI client per process, created on first
+use and cached with st.cache_resource so every page and utility module
+reuses the same keep-alive connection pools. The SDKs themselves are only
+imported when a client is first requested.
+"""
+
+from __future__ import annotations
+
+import os
+import importlib.util
+from typing import TYPE_CHECKING
+
+import streamlit as st
+from dotenv import load_dotenv
+
+if TYPE_CHECKING:
+    import httpx
+    from openai import AsyncOpenAI, OpenAI
+    from supabase import Client
+
+# Try to load env vars from common locations
+load_dotenv()
+load_dotenv(".hts_dashboard/.env")
+
+# Connection pool tuning (shared by all outbound HTTP clients)
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "20"))
+HTTP_KEEPALIVE_SECONDS = float(os.environ.get("HTTP_KEEPALIVE_SECONDS", "120"))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", "30"))
+HTTP2_ENABLED = os.environ.get("HTTP2_ENABLED", "1") != "0"
+
+
+def http_limits() -> httpx.Limits:
+    import httpx
+
+    return httpx.Limits(
+        max_connections=HTTP_POOL_SIZE,
+        max_keepalive_connections=HTTP_POOL_SIZE,
+        keepalive_expiry=HTTP_KEEPALIVE_SECONDS,
+    )
+
+
+def http_timeout() -> httpx.Timeout:
+    import httpx
+
+    return httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional `h2` package (httpx[http2])."""
+    return HTTP2_ENABLED and importlib.util.find_spec("h2") is not None
+
+
+def make_http_client(**kwargs) -> httpx.Client:
+    """A pooled, keep-alive httpx client using the shared tuning."""
+    import httpx
+
+    return httpx.Client(
+        http2=http2_available(),
+        limits=http_limits(),
+        timeout=http_timeout(),
+        **kwargs,
+    )
+
+
+def make_async_http_client(**kwargs) -> httpx.AsyncClient:
+    """Async counterpart of make_http_client()."""
+    import httpx
+
+    return httpx.AsyncClient(
+        http2=http2_available(),
+        limits=http_limits(),
+        timeout=http_timeout(),
+        **kwargs,
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def get_openai_client() -> OpenAI:
+    """Process-wide OpenAI client (embeddings and chat completions)."""
+    from openai import OpenAI
+
+    return OpenAI(
+        api_key=os.environ["OPENAI_API_KEY"],
+        http_client=make_http_client(),
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def get_supabase_client() -> Client | None:
+    """
+    Process-wide Supabase client, or None when credentials are missing.
+    """
+    url = os.environ.get("SUPABASE_URL")
+    key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
+
+    if not url or not key:
+        # This will be caught by the app, but we print for logs
+        print("❌ ERROR: Supabase credentials missing (SUPABASE_URL / SUPABASE_SERVICE_ROLE_KEY)")
+        return None
+
+    from supabase import create_client, ClientOptions
+
+    try:
+        # Newer supabase-py versions accept a shared httpx client
+        options = ClientOptions(
+            postgrest_client_timeout=HTTP_READ_TIMEOUT,
+            httpx_client=make_http_client(),
+        )
+    except TypeError:
+        # Older versions build their own (HTTP/2, keep-alive) PostgREST session
+        options = ClientOptions(postgrest_client_timeout=HTTP_READ_TIMEOUT)
+
+    return create_client(url, key, options=options)
+
+
+def rest_client_options() -> dict | None:
+    """
+    base_url and auth headers for the Supabase PostgREST API (/rest/v1),
+    or None when credentials are missing.
+    """
+    url = os.environ.get("SUPABASE_URL")
+    key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
+
+    if not url or not key:
+        print("❌ ERROR: Supabase credentials missing (SUPABASE_URL / SUPABASE_SERVICE_ROLE_KEY)")
+        return None
+
+    return {
+        "base_url": f"{url.rstrip('/')}/rest/v1",
+        "headers": {
+            "apikey": key,
+            "Authorization": f"Bearer {key}",
+            "Content-Type": "application/json",
+        },
+    }
+
+
+@st.cache_resource(show_spinner=False)
+def get_rest_client() -> httpx.Client | None:
+    """
+    Sync httpx client for the Supabase PostgREST API. Unlike the SDK client
+    it takes a per-request timeout, which search uses to enforce its
+    deadline.
+    """
+    options = rest_client_options()
+    return make_http_client(**options) if options else None
+
+
+# The async clients below are only ever used from the event loop owned by
+# utils.async_search, so their connection pools stay bound to one loop.
+
+@st.cache_resource(show_spinner=False)
+def get_async_openai_client() -> AsyncOpenAI:
+    """Process-wide AsyncOpenAI client."""
+    from openai import AsyncOpenAI
+
+    return AsyncOpenAI(
+        api_key=os.environ["OPENAI_API_KEY"],
+        http_client=make_async_http_client(),
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def get_async_rest_client() -> httpx.AsyncClient | None:
+    """
+    Async httpx client for the Supabase PostgREST API (base URL /rest/v1),
+    or None when credentials are missing.
+    """
+    options = rest_client_options()
+    return make_async_http_client(**options) if options else None
@@ -0,0 +1,176 @@
+"""
+HTS Dashboard - Persistent Disk Cache
+
+A small SQLite-backed key/value store shared by the app's caches.
+Entries are evicted least-recently-used once a namespace exceeds its size
+limit, and expire after a fixed time-to-live.
+"""
+
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+
+CACHE_DB_PATH = os.environ.get("CACHE_DB_PATH", ".hts_cache/cache.sqlite")
+
+
+def make_key(*parts) -> str:
+    """Build a content-addressed key from the given parts."""
+    raw = "\x1f".join(str(p) for p in parts)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """
+    LRU/TTL key-value cache stored in a SQLite file.
+
+    Several caches can share one file; each one uses its own namespace.
+    Hit and miss counters are kept per process.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        path: str = CACHE_DB_PATH,
+        max_entries: int = 10000,
+        ttl_seconds: float | None = None,
+    ):
+        self.namespace = namespace
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS cache_entries_lru ON cache_entries (namespace, accessed_at)"
+        )
+        self._conn.commit()
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def get_many(self, keys: list[str]) -> dict[str, bytes]:
+        """Return the cached values for whichever of `keys` are present."""
+        if not keys:
+            return {}
+
+        now = time.time()
+        found, expired = {}, []
+        unique_keys = list(dict.fromkeys(keys))
+
+        with self._lock:
+            # SQLite limits bound parameters, so look keys up in slices
+            for start in range(0, len(unique_keys), 500):
+                chunk = unique_keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, value, created_at FROM cache_entries "
+                    f"WHERE namespace = ? AND key IN ({placeholders})",
+                    [self.namespace, *chunk],
+                ).fetchall()
+
+                for key, value, created_at in rows:
+                    if self._is_expired(created_at, now):
+                        expired.append(key)
+                    else:
+                        found[key] = value
+
+            if expired:
+                self._conn.executemany(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                    [(self.namespace, k) for k in expired],
+                )
+            if found:
+                self._conn.executemany(
+                    "UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                    [(now, self.namespace, k) for k in found],
+                )
+            self._conn.commit()
+
+            self.hits += len(found)
+            self.misses += len(unique_keys) - len(found)
+
+        return found
+
+    def get(self, key: str) -> bytes | None:
+        return self.get_many([key]).get(key)
+
+    def set_many(self, items: dict[str, bytes]) -> None:
+        """Store several values and evict the least recently used overflow."""
+        if not items:
+            return
+
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, value, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(self.namespace, k, v, now, now) for k, v in items.items()],
+            )
+            self._evict()
+            self._conn.commit()
+
+    def set(self, key: str, value: bytes) -> None:
+        self.set_many({key: value})
+
+    def _evict(self) -> None:
+        if self.ttl_seconds is not None:
+            self._conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND created_at < ?",
+                (self.namespace, time.time() - self.ttl_seconds),
+            )
+
+        (count,) = self._conn.execute(
+            "SELECT COUNT(*) FROM cache_entries WHERE namespace = ?", (self.namespace,)
+        ).fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key IN ("
+                "SELECT key FROM cache_entries WHERE namespace = ? ORDER BY accessed_at LIMIT ?)",
+                (self.namespace, self.namespace, overflow),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        """Return entry count and hit/miss counters for this namespace."""
+        with self._lock:
+            (entries,) = self._conn.execute(
+                "SELECT COUNT(*) FROM cache_entries WHERE namespace = ?", (self.namespace,)
+            ).fetchone()
+
+        lookups = self.hits + self.misses
+        return {
+            "namespace": self.namespace,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -1,12 +1,14 @@
 """
 HTS Dashboard - Duty Rate Information
 
-This module provides duty rate categorization for HTS codes.
-In a production system, this would integrate with a real duty rate API.
+This module provides duty rate categorization for HTS codes. Categories
+come from the real general duty rates in the duty table (see
+build_duty_table.py) when it has been built, and from the prefix
+heuristics below otherwise.
 """
 
 
-# Mock duty rate data - in production, this would come from an API or database
+# Fallback duty rate data used when no duty table is available
 DUTY_RATE_MAP = {
     # Common patterns for demonstration
     "0101": "Free",      # Live horses
@@ -37,6 +39,31 @@ def get_duty_category(hts_code: str) -> str:
     Returns:
         Duty category: "Free", "Low", "Medium", or "High"
     """
+    return get_duty_categories([hts_code])[0]
+
+
+def get_duty_categories(hts_codes: list[str]) -> list[str]:
+    """
+    Get duty rate categories for many HTS codes in one pass.
+    
+    Args:
+        hts_codes: HTS codes (e.g., ["3923.30.00", "8471.30.01"])
+    
+    Returns:
+        One category per code: "Free", "Low", "Medium", or "High"
+    """
+    from utils.duty_table import get_duty_table
+
+    table = get_duty_table()
+    categories = table.categorize(hts_codes) if table is not None else [None] * len(hts_codes)
+    return [
+        category or _heuristic_category(code or "")
+        for code, category in zip(hts_codes, categories)
+    ]
+
+
+def _heuristic_category(hts_code: str) -> str:
+    """Prefix-based guess used for codes without a parsed rate."""
     
     # Try to match by first 4 digits
     if len(hts_code) >= 4:
@@ -90,11 +117,17 @@ def estimate_duty_rate(hts_code: str) -> dict:
         hts_code: HTS code
     
     Returns:
-        Dictionary with category, description, and estimated range
+        Dictionary with category, description, general rate text (when the
+        duty table is available) and estimated range
     """
     
     category = get_duty_category(hts_code)
     description = get_duty_description(category)
+
+    from utils.duty_table import get_duty_table
+
+    table = get_duty_table()
+    general_rate = table.general_rate(hts_code) if table is not None else None
     
     # Estimated rate ranges
     rate_ranges = {
@@ -107,6 +140,29 @@ def estimate_duty_rate(hts_code: str) -> dict:
     return {
         "category": category,
         "description": description,
-        "estimated_range": rate_ranges.get(category, "Varies"),
+        "general_rate": general_rate,
+        "estimated_range": general_rate or rate_ranges.get(category, "Varies"),
         "note": "⚠️ This is an estimate. Verify actual rates with official HTS database."
     }
+
+
+def estimate_landed_duty(hts_codes: list[str], values, quantities=None):
+    """
+    Estimate the duty owed on many shipment lines in one vectorized call,
+    using the parsed general rates (ad valorem, specific and compound).
+    
+    Args:
+        hts_codes: HTS code per line
+        values: Customs value per line in USD
+        quantities: Quantity per line, in the unit of each code's specific
+            rate (see DutyTable.units_for); optional for ad valorem lines
+    
+    Returns:
+        NumPy array of duties in USD, NaN where a line cannot be priced
+    """
+    from utils.duty_table import get_duty_table
+
+    table = get_duty_table()
+    if table is None:
+        raise RuntimeError("Duty table not found. Run build_duty_table.py to create it.")
+    return table.estimate_landed_duty(hts_codes, values, quantities)
@@ -0,0 +1,299 @@
+"""
+HTS Dashboard - Duty Rate Table
+
+A compact lookup table of general (column 1) duty rates parsed once from
+the `general` field of the HTS JSON export. Codes are stored as sorted
+digit strings next to columnar arrays of the parsed rate (kind, ad valorem
+percent, specific amount in USD and its unit), so a lookup is a
+longest-prefix match done with binary search. Statistical suffixes and
+other rows without a rate of their own inherit the rate of the closest
+rated ancestor.
+
+estimate_landed_duty() prices many lines at once with NumPy.
+"""
+
+import os
+import re
+import json
+import threading
+from bisect import bisect_left
+
+import numpy as np
+
+from utils.snapshot import code_digits
+
+DUTY_TABLE_PATH = os.environ.get("DUTY_TABLE_PATH", ".hts_cache/duty_table.npz")
+
+# Bump when the stored arrays change shape or meaning
+DUTY_TABLE_VERSION = 4
+
+# HTS numbers have 4, 6, 8 or 10 digits; chapters (2) are never rated
+CODE_LEVELS = (10, 8, 6, 4)
+
+# Category thresholds in percent, matching get_duty_description()
+CATEGORIES = ("Free", "Low", "Medium", "High")
+LOW_MAX_RATE = 5.0
+MEDIUM_MAX_RATE = 15.0
+
+# Rate kinds stored in DutyTable.kinds
+RATE_UNKNOWN = 0    # text the parser does not understand
+RATE_FREE = 1       # "Free"
+RATE_AD_VALOREM = 2  # "6.5%"
+RATE_SPECIFIC = 3   # "2.2¢/kg", "$1.035/kg"
+RATE_COMPOUND = 4   # "1.5¢/kg + 3%"
+
+_PERCENT = re.compile(r"(\d+(?:\.\d+)?)\s*%")
+# Per-unit amounts: "2.2¢/kg", "$1.035/kg", "5.5¢/m2", "0.4¢ each"; units
+# may end in a digit or superscript (m2, m³)
+_SPECIFIC = re.compile(r"(\$)?\s*(\d+(?:\.\d+)?)\s*(¢)?\s*(?:/\s*([A-Za-z]+[\d²³]*\.?)|(each)\b)")
+_UNIT_SUFFIX = str.maketrans("²³", "23")
+_CURRENCY = re.compile(r"[$¢]")
+_FOOTNOTE = re.compile(r"\s\d+/(?=\s|$)")
+
+_table = None
+_table_mtime = None
+_table_lock = threading.Lock()
+
+
+def parse_duty_rate(text: str | None) -> tuple[int, float, float, str]:
+    """
+    Parse a general duty rate into (kind, ad valorem %, specific USD per
+    unit, unit).
+
+    'Free' -> (RATE_FREE, 0, 0, ''), '6.5%' -> (RATE_AD_VALOREM, 6.5, 0, ''),
+    '2.2¢/kg' -> (RATE_SPECIFIC, 0, 0.022, 'kg'), '1.5¢/kg + 3%' ->
+    (RATE_COMPOUND, 3, 0.015, 'kg'), '0.4¢ each + 6.3%' -> (RATE_COMPOUND,
+    6.3, 0.004, 'each'), '5.5¢/m2' -> (RATE_SPECIFIC, 0, 0.055, 'm2').
+    Anything else, including money amounts the parser
+    cannot read, is RATE_UNKNOWN with NaN amounts rather than a partial
+    rate. Only the first specific and percent terms are used, so
+    sliding-scale rates ("... less 0.02¢/kg for each degree ...") are
+    approximated by their base rate.
+    """
+    # Footnote markers such as 'Free 1/' are not part of the rate
+    text = _FOOTNOTE.sub("", " " + (text or "")).strip()
+    if text.lower() == "free":
+        return RATE_FREE, 0.0, 0.0, ""
+
+    specific = _SPECIFIC.search(text)
+    if specific and not (specific.group(1) or specific.group(3)):
+        # A bare number before a unit is not a rate we can price
+        specific = None
+    percent = _PERCENT.search(text)
+
+    nan = float("nan")
+    if specific is None and (percent is None or _CURRENCY.search(text)):
+        # Nothing to parse, or a money amount we could not read: reporting
+        # only the percentage would underprice the line
+        return RATE_UNKNOWN, nan, nan, ""
+
+    ad_valorem = float(percent.group(1)) if percent else 0.0
+    if specific is None:
+        return RATE_AD_VALOREM, ad_valorem, 0.0, ""
+
+    # Rounded so '2.2¢' is 0.022, not 0.022000000000000002
+    amount = round(float(specific.group(2)) / (100.0 if specific.group(3) else 1.0), 8)
+    unit = (specific.group(4) or specific.group(5)).rstrip(".").lower().translate(_UNIT_SUFFIX)
+    return (RATE_COMPOUND if percent else RATE_SPECIFIC), ad_valorem, amount, unit
+
+
+def parse_ad_valorem(text: str | None) -> float:
+    """
+    'Free' -> 0.0, '6.5%' -> 6.5. Specific, compound and unparsed rates
+    return NaN, since they cannot be compared as a percentage.
+    """
+    kind, ad_valorem, _, _ = parse_duty_rate(text)
+    return ad_valorem if kind in (RATE_FREE, RATE_AD_VALOREM) else float("nan")
+
+
+def category_for_rate(rate: float) -> str | None:
+    """Map an ad valorem rate to Free/Low/Medium/High (None for NaN)."""
+    if rate != rate:
+        return None
+    if rate == 0:
+        return "Free"
+    if rate < LOW_MAX_RATE:
+        return "Low"
+    if rate <= MEDIUM_MAX_RATE:
+        return "Medium"
+    return "High"
+
+
+class DutyTable:
+    """
+    Sorted code digits with parallel columns for the general rate text and
+    its parsed form. Lookups are memoized per code string.
+    """
+
+    COLUMNS = ("codes", "general", "kinds", "ad_valorem", "specific", "units")
+
+    def __init__(self, codes, general, kinds, ad_valorem, specific, units, source: str = ""):
+        order = np.argsort(codes, kind="stable")
+        self.codes = np.asarray(codes)[order]
+        self.general = np.asarray(general)[order]
+        self.kinds = np.asarray(kinds, dtype=np.int8)[order]
+        self.ad_valorem = np.asarray(ad_valorem, dtype=np.float64)[order]
+        self.specific = np.asarray(specific, dtype=np.float64)[order]
+        self.units = np.asarray(units)[order]
+        self.source = source
+
+        # Percentage used for categories: only Free and pure ad valorem rates
+        comparable = np.isin(self.kinds, (RATE_FREE, RATE_AD_VALOREM))
+        self.rates = np.where(comparable, self.ad_valorem, np.nan)
+
+        self._code_list = self.codes.tolist()
+        self._memo = {}
+        self._categories = {}
+
+    def __len__(self) -> int:
+        return len(self._code_list)
+
+    @classmethod
+    def from_items(cls, items: list[dict], source: str = "") -> "DutyTable":
+        """Build from HTS JSON rows, keeping every numbered row with a general rate."""
+        rated = {}
+        for item in items:
+            digits = code_digits(item.get("htsno"))
+            general = (item.get("general") or "").strip()
+            if digits and general:
+                rated[digits] = general
+
+        codes = list(rated)
+        general = [rated[c] for c in codes]
+        kinds, ad_valorem, specific, units = zip(*(parse_duty_rate(g) for g in general)) if general else ([],) * 4
+        return cls(
+            np.array(codes), np.array(general), np.array(kinds), np.array(ad_valorem),
+            np.array(specific), np.array(units), source=source,
+        )
+
+    @classmethod
+    def load(cls, path: str = DUTY_TABLE_PATH) -> "DutyTable":
+        with np.load(path) as data:
+            meta = json.loads(data["meta"].tobytes().decode("utf-8"))
+            if meta.get("version") != DUTY_TABLE_VERSION:
+                raise ValueError(
+                    f"Duty table {path} is version {meta.get('version')}, expected {DUTY_TABLE_VERSION}. "
+                    "Rebuild it with build_duty_table.py."
+                )
+            return cls(*(data[column] for column in cls.COLUMNS), source=meta.get("source", ""))
+
+    def save(self, path: str = DUTY_TABLE_PATH) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        meta = json.dumps({"version": DUTY_TABLE_VERSION, "source": self.source}).encode("utf-8")
+        np.savez(
+            path,
+            **{column: getattr(self, column) for column in self.COLUMNS},
+            meta=np.frombuffer(meta, dtype=np.uint8),
+        )
+
+    def _find(self, key: str) -> int:
+        pos = bisect_left(self._code_list, key)
+        if pos < len(self._code_list) and self._code_list[pos] == key:
+            return pos
+        return -1
+
+    def lookup_index(self, hts_code: str) -> int:
+        """
+        Row of the longest rated prefix of `hts_code` (dots ignored), or -1.
+        """
+        if hts_code in self._memo:
+            return self._memo[hts_code]
+
+        digits = code_digits(hts_code)
+        index = -1
+        for level in CODE_LEVELS:
+            if len(digits) >= level:
+                index = self._find(digits[:level])
+                if index >= 0:
+                    break
+
+        self._memo[hts_code] = index
+        return index
+
+    def lookup_indices(self, codes: list[str]) -> np.ndarray:
+        """lookup_index() for a batch of codes, as an index array."""
+        return np.fromiter((self.lookup_index(c) for c in codes), dtype=np.int64, count=len(codes))
+
+    def rates_for(self, codes: list[str]) -> np.ndarray:
+        """Ad valorem rate per code; NaN when unknown or not ad valorem."""
+        indices = self.lookup_indices(codes)
+        rates = np.full(len(codes), np.nan)
+        found = indices >= 0
+        rates[found] = self.rates[indices[found]]
+        return rates
+
+    def general_rate(self, hts_code: str) -> str | None:
+        """The general rate text that applies to `hts_code`, e.g. '6.5%'."""
+        index = self.lookup_index(hts_code)
+        return str(self.general[index]) if index >= 0 else None
+
+    def units_for(self, codes: list[str]) -> list[str]:
+        """Unit of each code's specific rate ('' for none), i.e. the unit
+        estimate_landed_duty() expects quantities in."""
+        indices = self.lookup_indices(codes)
+        return [str(self.units[i]) if i >= 0 else "" for i in indices.tolist()]
+
+    def estimate_landed_duty(self, codes: list[str], values, quantities=None) -> np.ndarray:
+        """
+        Duty in USD for each line: value * ad valorem % + quantity * specific
+        rate, computed for all lines at once.
+
+        Args:
+            codes: HTS code per line
+            values: Customs value per line in USD
+            quantities: Quantity per line in the unit given by units_for();
+                only needed for specific and compound rates
+
+        Returns:
+            float64 array of duties; NaN where the code has no parsed rate or a
+            specific rate has no quantity
+        """
+        indices = self.lookup_indices(codes)
+        values = np.asarray(values, dtype=np.float64)
+        if quantities is None:
+            quantities = np.full(len(indices), np.nan)
+        quantities = np.asarray(quantities, dtype=np.float64)
+
+        found = indices >= 0
+        safe = np.where(found, indices, 0)
+        kinds = np.where(found, self.kinds[safe], RATE_UNKNOWN)
+        ad_valorem = self.ad_valorem[safe]
+        specific = self.specific[safe]
+
+        with np.errstate(invalid="ignore"):
+            duty = values * ad_valorem / 100.0 + np.where(specific > 0, quantities * specific, 0.0)
+        duty[kinds == RATE_UNKNOWN] = np.nan
+        return duty
+
+    def categorize(self, codes: list[str]) -> list[str | None]:
+        """Duty category per code, or None when the table has no usable rate."""
+        memo = self._categories
+        missing = [c for c in dict.fromkeys(codes) if c not in memo]
+        if missing:
+            memo.update(zip(missing, (category_for_rate(r) for r in self.rates_for(missing).tolist())))
+        return [memo[c] for c in codes]
+
+
+def get_duty_table(path: str = DUTY_TABLE_PATH) -> DutyTable | None:
+    """
+    Return the shared duty table, or None when it has not been built.
+    Reloaded when the file is replaced.
+    """
+    global _table, _table_mtime
+
+    if not os.path.exists(path):
+        return None
+
+    with _table_lock:
+        mtime = os.path.getmtime(path)
+        if _table is None or _table_mtime != mtime:
+            try:
+                _table = DutyTable.load(path)
+            except Exception as e:
+                print(f"⚠️ Duty table unavailable: {str(e)}")
+                _table = None
+            _table_mtime = mtime
+    return _table
@@ -1,20 +1,166 @@
 import os
-from openai import OpenAI
+import asyncio
+import threading
+from array import array
 
-client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
+from utils.clients import get_async_openai_client, get_openai_client
+from utils.disk_cache import DiskCache, make_key
 
-EMBEDDING_MODEL = os.environ["EMBEDDING_MODEL"]
-EMBEDDING_DIM = int(os.environ["EMBEDDING_DIM"])
+# Read with defaults so importing this module never fails; the OpenAI
+# client itself is only built on the first embedding request
+EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "text-embedding-3-small")
+EMBEDDING_DIM = int(os.environ.get("EMBEDDING_DIM", "1536"))
 
-def embed_text(text: str):
-    response = client.embeddings.create(
+# The embeddings endpoint accepts at most 2048 inputs per request
+EMBEDDING_BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE", "2048"))
+
+# Query embedding cache (set EMBEDDING_CACHE=0 to disable)
+EMBEDDING_CACHE_ENABLED = os.environ.get("EMBEDDING_CACHE", "1") != "0"
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.environ.get("EMBEDDING_CACHE_MAX_ENTRIES", "50000"))
+EMBEDDING_CACHE_TTL_DAYS = float(os.environ.get("EMBEDDING_CACHE_TTL_DAYS", "30"))
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> DiskCache | None:
+    """Return the shared query-embedding cache, or None when disabled."""
+    global _cache
+
+    if not EMBEDDING_CACHE_ENABLED:
+        return None
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = DiskCache(
+                    "embeddings",
+                    max_entries=EMBEDDING_CACHE_MAX_ENTRIES,
+                    ttl_seconds=EMBEDDING_CACHE_TTL_DAYS * 86400,
+                )
+    return _cache
+
+
+def normalize_query(text: str) -> str:
+    """Collapse whitespace so trivially different queries share a cache entry."""
+    return " ".join(text.split())
+
+
+def embedding_cache_key(text: str) -> str:
+    return make_key(normalize_query(text), EMBEDDING_MODEL, EMBEDDING_DIM)
+
+
+def _response_vectors(response) -> list[list[float]]:
+    vectors = [d.embedding for d in sorted(response.data, key=lambda d: d.index)]
+
+    # safety check
+    for vector in vectors:
+        if len(vector) != EMBEDDING_DIM:
+            raise ValueError(f"Embedding dimension mismatch: expected {EMBEDDING_DIM}, got {len(vector)}")
+
+    return vectors
+
+
+def _request_embeddings(texts: list[str]) -> list[list[float]]:
+    response = get_openai_client().embeddings.create(
         model=EMBEDDING_MODEL,
-        input=text
+        input=texts
     )
-    vector = response.data[0].embedding
+    return _response_vectors(response)
+
+
+async def _request_embeddings_async(texts: list[str]) -> list[list[float]]:
+    response = await get_async_openai_client().embeddings.create(
+        model=EMBEDDING_MODEL,
+        input=texts
+    )
+    return _response_vectors(response)
+
+
+def _plan_batches(texts: list[str]):
+    """
+    Normalize `texts`, fill what the cache already has, and split the
+    remaining distinct texts into request batches.
+
+    Returns (keys, vectors, batches) where `vectors` maps cache key to
+    vector and each batch is a list of (key, text) pairs.
+    """
+    normalized = [normalize_query(t) for t in texts]
+    keys = [embedding_cache_key(t) for t in normalized]
+    cache = get_embedding_cache()
+
+    vectors: dict[str, list[float]] = {}
+    if cache is not None:
+        for key, blob in cache.get_many(keys).items():
+            vectors[key] = array("f", blob).tolist()
+
+    # One request slot per distinct uncached text, in first-seen order
+    pending = {}
+    for key, text in zip(keys, normalized):
+        if key not in vectors and key not in pending:
+            pending[key] = text
+
+    pending_items = list(pending.items())
+    batches = [
+        pending_items[start:start + EMBEDDING_BATCH_SIZE]
+        for start in range(0, len(pending_items), EMBEDDING_BATCH_SIZE)
+    ]
+    return keys, vectors, batches
+
+
+def _store(fresh: dict[str, list[float]]) -> None:
+    cache = get_embedding_cache()
+    if cache is not None:
+        cache.set_many({k: array("f", v).tobytes() for k, v in fresh.items()})
+
+
+def embed_texts(texts: list[str], trace: dict | None = None, cache: bool = True) -> list[list[float]]:
+    """
+    Embed several texts with as few API calls as possible.
+
+    Inputs are normalized and deduplicated, cached vectors are reused, and
+    the remaining texts are sent in batches of up to EMBEDDING_BATCH_SIZE.
+    The returned list lines up with `texts`. If `trace` is given,
+    trace["cache_hit"] is set to whether every vector came from the cache.
+    With cache=False cached vectors are still reused but new ones are not
+    stored, so bulk runs do not evict interactive queries from the cache.
+    """
+    keys, vectors, batches = _plan_batches(texts)
+    if trace is not None:
+        trace["cache_hit"] = not batches
+
+    for batch in batches:
+        fresh = dict(zip((k for k, _ in batch), _request_embeddings([t for _, t in batch])))
+        vectors.update(fresh)
+        if cache:
+            _store(fresh)
+
+    return [vectors[key] for key in keys]
+
+
+async def embed_texts_async(texts: list[str], trace: dict | None = None, cache: bool = True) -> list[list[float]]:
+    """
+    Async version of embed_texts(). Batches are requested concurrently.
+    """
+    keys, vectors, batches = _plan_batches(texts)
+    if trace is not None:
+        trace["cache_hit"] = not batches
+
+    results = await asyncio.gather(
+        *(_request_embeddings_async([t for _, t in batch]) for batch in batches)
+    )
+    for batch, batch_vectors in zip(batches, results):
+        fresh = dict(zip((k for k, _ in batch), batch_vectors))
+        vectors.update(fresh)
+        if cache:
+            _store(fresh)
+
+    return [vectors[key] for key in keys]
+
+
+def embed_text(text: str, trace: dict | None = None):
+    return embed_texts([text], trace)[0]
 
-    # safety check
-    if len(vector) != EMBEDDING_DIM:
-        raise ValueError(f"Embedding dimension mismatch: expected {EMBEDDING_DIM}, got {len(vector)}")
 
-    return vector
+async def embed_text_async(text: str, trace: dict | None = None):
+    return (await embed_texts_async([text], trace))[0]
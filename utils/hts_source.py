@@ -0,0 +1,88 @@
+"""
+HTS Dashboard - HTS Source Data
+
+Helpers for reading the USITC HTS JSON export that the knowledge base is
+built from.
+"""
+
+import os
+import json
+import hashlib
+from typing import Dict, List
+
+HTS_JSON_PATH = os.environ.get("HTS_JSON_PATH", "hts_2026_basic_edition_json.json")
+
+
+def load_hts_items(path: str = HTS_JSON_PATH) -> List[Dict]:
+    """Load the HTS JSON export as a list of row dicts."""
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def file_fingerprint(path: str) -> str:
+    """Hash a source file so checkpoints can tell when it has changed."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def content_hash(text: str, model: str) -> str:
+    """
+    Fingerprint of the text an embedding was built from and the model that
+    built it. Must match the SQL expression used by stale_hts_chunks().
+    """
+    return hashlib.sha256(f"{model}:{text or ''}".encode("utf-8")).hexdigest()
+
+
+def flatten_hts_item(item: Dict) -> str:
+    """Turn one HTS JSON object into the text string that gets embedded."""
+    parts = [
+        f"HTS: {item.get('htsno','')}",
+        f"Indent: {item.get('indent','')}",
+        f"Description: {item.get('description','')}",
+        f"General Duty: {item.get('general','')}",
+        f"Special Duty: {item.get('special','')}",
+        f"Other Duty: {item.get('other','')}",
+    ]
+
+    # Optional footnotes
+    fns = item.get("footnotes") or []
+    if isinstance(fns, list) and len(fns) > 0:
+        fn_texts = [fn.get("value", "") for fn in fns if isinstance(fn, dict)]
+        if fn_texts:
+            parts.append("Footnotes: " + " | ".join(fn_texts))
+
+    return " | ".join(p for p in parts if p and str(p).strip() != "")
+
+
+def assign_source_refs(items: List[Dict]) -> List[str]:
+    """
+    Build a stable natural key for every row.
+
+    Numbered rows use their HTS number. Un-numbered rows (indented
+    description lines such as "Other:") have no code of their own, so they
+    are keyed by the closest preceding HTS number plus a hash of their
+    indent and text.
+    """
+    refs = []
+    seen = {}
+    last_code = ""
+
+    for item in items:
+        code = (item.get("htsno") or "").strip()
+        if code:
+            last_code = code
+            ref = code
+        else:
+            text = f"{item.get('indent', '')}|{(item.get('description') or '').strip()}"
+            ref = f"{last_code}~{hashlib.sha1(text.encode('utf-8')).hexdigest()[:12]}"
+
+        # Disambiguate repeated keys (identical lines under the same code)
+        seen[ref] = seen.get(ref, 0) + 1
+        if seen[ref] > 1:
+            ref = f"{ref}~{seen[ref]}"
+        refs.append(ref)
+
+    return refs
@@ -0,0 +1,223 @@
+"""
+HTS Dashboard - HTS Hierarchy Tree
+
+The HTS schedule as a tree built once from the `indent` levels of the HTS
+JSON export. Every row becomes a node with a parent pointer; chapters are
+added as synthetic roots. Subtree sizes and child lists are precomputed,
+and HTS numbers map to nodes in O(1), so the hierarchy views and the
+Browser never re-derive the structure from code strings.
+
+The tree is saved as a versioned .npz next to the other local indexes.
+"""
+
+import os
+import json
+import threading
+
+import numpy as np
+
+from utils.snapshot import code_digits
+
+HTS_TREE_PATH = os.environ.get("HTS_TREE_PATH", ".hts_cache/hts_tree.npz")
+
+# Bump when the stored arrays change shape or meaning
+HTS_TREE_VERSION = 1
+
+# HTS numbers have 4, 6, 8 or 10 digits
+CODE_LEVELS = (10, 8, 6, 4)
+
+_tree = None
+_tree_mtime = None
+_tree_lock = threading.Lock()
+
+
+class HTSTree:
+    """
+    Columnar tree: node i has codes[i], descriptions[i], indents[i] and
+    parents[i] (-1 for chapter roots). Nodes are in schedule order, so every
+    parent comes before its children.
+    """
+
+    COLUMNS = ("codes", "descriptions", "indents", "parents")
+
+    def __init__(self, codes, descriptions, indents, parents, source: str = ""):
+        self.codes = np.asarray(codes)
+        self.descriptions = np.asarray(descriptions)
+        self.indents = np.asarray(indents, dtype=np.int16)
+        self.parents = np.asarray(parents, dtype=np.int32)
+        self.source = source
+
+        n = len(self.parents)
+
+        # Children as CSR: child_index[child_start[i]:child_start[i + 1]]
+        has_parent = self.parents >= 0
+        child_nodes = np.nonzero(has_parent)[0]
+        order = np.argsort(self.parents[child_nodes], kind="stable")
+        self._child_index = child_nodes[order]
+        counts = np.bincount(self.parents[child_nodes], minlength=n)
+        self._child_start = np.concatenate(([0], np.cumsum(counts)))
+        self.roots = np.nonzero(~has_parent)[0]
+
+        # Subtree sizes (including the node); parents precede children
+        sizes = np.ones(n, dtype=np.int64)
+        for node in range(n - 1, -1, -1):
+            parent = self.parents[node]
+            if parent >= 0:
+                sizes[parent] += sizes[node]
+        self.subtree_sizes = sizes
+
+        # Dot-insensitive HTS number -> node (first occurrence wins)
+        self._by_digits = {}
+        for node, code in enumerate(self.codes.tolist()):
+            digits = code_digits(code)
+            if digits:
+                self._by_digits.setdefault(digits, node)
+
+    def __len__(self) -> int:
+        return len(self.parents)
+
+    @classmethod
+    def from_items(cls, items: list[dict], source: str = "") -> "HTSTree":
+        """
+        Build from HTS JSON rows in schedule order. A row's parent is the
+        closest preceding row with a smaller indent; indent-0 rows hang
+        under a synthetic node for their chapter.
+        """
+        codes, descriptions, indents, parents = [], [], [], []
+        chapters = {}
+        # (indent, node) for the current path from the chapter down
+        stack = []
+
+        for item in items:
+            code = (item.get("htsno") or "").strip()
+            try:
+                indent = int(item.get("indent") or 0)
+            except (TypeError, ValueError):
+                indent = 0
+
+            digits = code_digits(code)
+            if indent == 0 and digits:
+                chapter = digits[:2]
+                if chapter not in chapters:
+                    chapters[chapter] = len(codes)
+                    codes.append(chapter)
+                    descriptions.append(f"Chapter {chapter}")
+                    indents.append(-1)
+                    parents.append(-1)
+                stack = [(-1, chapters[chapter])]
+
+            while stack and stack[-1][0] >= indent:
+                stack.pop()
+
+            node = len(codes)
+            codes.append(code)
+            descriptions.append((item.get("description") or "").strip())
+            indents.append(indent)
+            parents.append(stack[-1][1] if stack else -1)
+            stack.append((indent, node))
+
+        return cls(codes, descriptions, indents, parents, source=source)
+
+    @classmethod
+    def load(cls, path: str = HTS_TREE_PATH) -> "HTSTree":
+        with np.load(path) as data:
+            meta = json.loads(data["meta"].tobytes().decode("utf-8"))
+            if meta.get("version") != HTS_TREE_VERSION:
+                raise ValueError(
+                    f"HTS tree {path} is version {meta.get('version')}, expected {HTS_TREE_VERSION}. "
+                    "Rebuild it with build_hts_tree.py."
+                )
+            return cls(*(data[column] for column in cls.COLUMNS), source=meta.get("source", ""))
+
+    def save(self, path: str = HTS_TREE_PATH) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        meta = json.dumps({"version": HTS_TREE_VERSION, "source": self.source}).encode("utf-8")
+        np.savez(
+            path,
+            **{column: getattr(self, column) for column in self.COLUMNS},
+            meta=np.frombuffer(meta, dtype=np.uint8),
+        )
+
+    def find(self, hts_code: str) -> int:
+        """
+        Node for an HTS number (dots ignored), falling back to the closest
+        ancestor level that exists. -1 when nothing matches.
+        """
+        digits = code_digits(hts_code)
+        node = self._by_digits.get(digits)
+        if node is not None:
+            return node
+        for level in CODE_LEVELS:
+            if len(digits) > level and digits[:level] in self._by_digits:
+                return self._by_digits[digits[:level]]
+        return self._by_digits.get(digits[:2], -1) if len(digits) >= 2 else -1
+
+    def node(self, index: int) -> dict:
+        return {
+            "index": int(index),
+            "hts_code": str(self.codes[index]),
+            "title": str(self.descriptions[index]),
+            "indent": int(self.indents[index]),
+            "parent": int(self.parents[index]),
+            "children": int(self._child_start[index + 1] - self._child_start[index]),
+            "subtree_size": int(self.subtree_sizes[index]),
+        }
+
+    def children(self, index: int) -> list[int]:
+        """Child node indices in schedule order."""
+        return self._child_index[self._child_start[index]:self._child_start[index + 1]].tolist()
+
+    def ancestors(self, index: int) -> list[int]:
+        """Path from the chapter root down to `index` (inclusive)."""
+        path = []
+        while index >= 0:
+            path.append(int(index))
+            index = int(self.parents[index])
+        return path[::-1]
+
+    def label(self, index: int, width: int = 40) -> str:
+        code = str(self.codes[index])
+        title = str(self.descriptions[index])
+        if len(title) > width:
+            title = title[:width - 1].rstrip() + "…"
+        if self.indents[index] < 0 or not code:
+            return title
+        return f"{code} {title}"
+
+    def breadcrumb(self, hts_code: str, width: int = 40, include_self: bool = True) -> list[str]:
+        """
+        Labels from the chapter down to `hts_code`, [] if unknown. With
+        include_self=False only the ancestors of the code are returned.
+        """
+        node = self.find(hts_code)
+        if node < 0:
+            return []
+        path = self.ancestors(node)
+        if not include_self and code_digits(str(self.codes[node])) == code_digits(hts_code):
+            path = path[:-1]
+        return [self.label(i, width) for i in path]
+
+
+def get_hts_tree(path: str = HTS_TREE_PATH) -> HTSTree | None:
+    """
+    Return the shared HTS tree, or None when it has not been built.
+    Reloaded when the file is replaced.
+    """
+    global _tree, _tree_mtime
+
+    if not os.path.exists(path):
+        return None
+
+    with _tree_lock:
+        mtime = os.path.getmtime(path)
+        if _tree is None or _tree_mtime != mtime:
+            try:
+                _tree = HTSTree.load(path)
+            except Exception as e:
+                print(f"⚠️ HTS tree unavailable: {str(e)}")
+                _tree = None
+            _tree_mtime = mtime
+    return _tree
@@ -1,4 +1,4 @@
 from utils.search import semantic_search_hts
 
-def classify_hts(description: str, k: int):
-    return semantic_search_hts(description, k)
+def classify_hts(description: str, k: int, trace: dict | None = None):
+    return semantic_search_hts(description, k, trace=trace)
@@ -6,32 +6,76 @@ a product matches a particular HTS code.
 """
 
 import os
-from openai import OpenAI
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator
 
-client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
+from utils.clients import get_async_openai_client, get_openai_client
+from utils.disk_cache import DiskCache, make_key
+from utils.embeddings import normalize_query
 
+# Bump when the explanation prompt changes so cached answers are not reused
+PROMPT_VERSION = "1"
 
-def explain_classification(
+# Explanations are reused per (description, code, model, prompt version);
+# set EXPLANATION_CACHE=0 to disable
+EXPLANATION_CACHE_ENABLED = os.environ.get("EXPLANATION_CACHE", "1") != "0"
+EXPLANATION_CACHE_MAX_ENTRIES = int(os.environ.get("EXPLANATION_CACHE_MAX_ENTRIES", "5000"))
+EXPLANATION_CACHE_TTL_DAYS = float(os.environ.get("EXPLANATION_CACHE_TTL_DAYS", "90"))
+
+# Concurrent LLM calls when explaining several results at once
+EXPLAIN_MAX_WORKERS = int(os.environ.get("EXPLAIN_MAX_WORKERS", "5"))
+
+_explanation_cache = None
+_explanation_cache_lock = threading.Lock()
+
+
+def get_explanation_cache() -> DiskCache | None:
+    """Return the shared explanation cache, or None when disabled."""
+    global _explanation_cache
+
+    if not EXPLANATION_CACHE_ENABLED:
+        return None
+
+    if _explanation_cache is None:
+        with _explanation_cache_lock:
+            if _explanation_cache is None:
+                _explanation_cache = DiskCache(
+                    "explanations",
+                    max_entries=EXPLANATION_CACHE_MAX_ENTRIES,
+                    ttl_seconds=EXPLANATION_CACHE_TTL_DAYS * 86400,
+                )
+    return _explanation_cache
+
+
+def explanation_cache_key(product_description: str, hts_code: str, model: str = "gpt-4o-mini") -> str:
+    return make_key(normalize_query(product_description), hts_code, model, PROMPT_VERSION)
+
+
+def cached_explanation(product_description: str, hts_code: str, model: str = "gpt-4o-mini") -> str | None:
+    """A previously generated explanation for this product and code, if any."""
+    cache = get_explanation_cache()
+    if cache is None:
+        return None
+    blob = cache.get(explanation_cache_key(product_description, hts_code, model))
+    return blob.decode("utf-8") if blob is not None else None
+
+
+def _store_explanation(product_description: str, hts_code: str, model: str, explanation: str) -> None:
+    cache = get_explanation_cache()
+    if cache is not None and explanation:
+        cache.set(explanation_cache_key(product_description, hts_code, model), explanation.encode("utf-8"))
+
+
+def _explanation_request(
     product_description: str,
     hts_code: str,
     hts_title: str,
-    context: str = "",
-    model: str = "gpt-4o-mini"
-) -> str:
-    """
-    Generate a detailed explanation for why a product matches an HTS code.
-    
-    Args:
-        product_description: The product description provided by the user
-        hts_code: The HTS code being explained
-        hts_title: The title/description of the HTS code
-        context: Additional context from the HTS database (optional)
-        model: OpenAI model to use (default: gpt-4o-mini for speed/cost)
-    
-    Returns:
-        Markdown-formatted explanation
-    """
-    
+    context: str,
+    model: str,
+) -> dict:
+    """Chat completion arguments shared by the blocking and streaming calls."""
     prompt = f"""You are an expert in HTS (Harmonized Tariff Schedule) classification for international trade and customs.
 
 A user is trying to classify the following product:
@@ -57,49 +101,200 @@ Please provide a clear, concise explanation (3-4 paragraphs) covering:
 
 Format your response in clear markdown with headers. Be specific and practical."""
 
+    return dict(
+        model=model,
+        messages=[
+            {
+                "role": "system",
+                "content": "You are an expert HTS classification specialist. Provide clear, actionable explanations."
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ],
+        temperature=0.3,  # Lower temperature for more consistent, factual responses
+        max_tokens=1000,
+    )
+
+
+def _explanation_error(error: Exception) -> str:
+    return f"""
+### ⚠️ Error Generating Explanation
+
+Unable to generate explanation: {str(error)}
+
+Please try again or contact support if the issue persists.
+"""
+
+
+def explain_classification(
+    product_description: str,
+    hts_code: str,
+    hts_title: str,
+    context: str = "",
+    model: str = "gpt-4o-mini",
+    refresh: bool = False,
+) -> str:
+    """
+    Generate a detailed explanation for why a product matches an HTS code.
+    Successful explanations are cached on disk, so the same product and
+    code are only billed once.
+    
+    Args:
+        product_description: The product description provided by the user
+        hts_code: The HTS code being explained
+        hts_title: The title/description of the HTS code
+        context: Additional context from the HTS database (optional)
+        model: OpenAI model to use (default: gpt-4o-mini for speed/cost)
+        refresh: Skip the cache and replace its entry with a new explanation
+    
+    Returns:
+        Markdown-formatted explanation
+    """
+    if not refresh:
+        cached = cached_explanation(product_description, hts_code, model)
+        if cached is not None:
+            return cached
+
     try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert HTS classification specialist. Provide clear, actionable explanations."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.3,  # Lower temperature for more consistent, factual responses
-            max_tokens=1000,
+        response = get_openai_client().chat.completions.create(
+            **_explanation_request(product_description, hts_code, hts_title, context, model)
         )
         
         explanation = response.choices[0].message.content
+        _store_explanation(product_description, hts_code, model, explanation)
         return explanation
         
     except Exception as e:
-        return f"""
-### ⚠️ Error Generating Explanation
+        return _explanation_error(e)
 
-Unable to generate explanation: {str(e)}
 
-Please try again or contact support if the issue persists.
-"""
+def explain_classification_stream(
+    product_description: str,
+    hts_code: str,
+    hts_title: str,
+    context: str = "",
+    model: str = "gpt-4o-mini",
+    refresh: bool = False,
+) -> Iterator[str]:
+    """
+    Streaming version of explain_classification() that yields the markdown
+    explanation in chunks as the model produces them. Suitable for
+    st.write_stream, which returns the full text once the stream ends.
+    A cached explanation is yielded in one piece; a completed stream is
+    written to the cache.
+    
+    Args:
+        Same as explain_classification()
+    
+    Yields:
+        Pieces of the markdown-formatted explanation
+    """
+    if not refresh:
+        cached = cached_explanation(product_description, hts_code, model)
+        if cached is not None:
+            yield cached
+            return
 
+    parts = []
+    try:
+        stream = get_openai_client().chat.completions.create(
+            **_explanation_request(product_description, hts_code, hts_title, context, model),
+            stream=True,
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+                yield chunk.choices[0].delta.content
 
-def generate_search_variations(query: str, num_variations: int = 3) -> list[str]:
+    except Exception as e:
+        yield _explanation_error(e)
+        return
+
+    _store_explanation(product_description, hts_code, model, "".join(parts))
+
+
+def explain_many(
+    product_description: str,
+    results: list[dict],
+    max_workers: int = EXPLAIN_MAX_WORKERS,
+    model: str = "gpt-4o-mini",
+    refresh: bool = False,
+) -> Iterator[tuple[int, str]]:
     """
-    Generate alternative search queries to improve recall.
-    Used for multi-vector fallback when initial search has low confidence.
+    Explain several search results concurrently.
+
+    Cached explanations are yielded first; the rest run on a bounded thread
+    pool and are yielded as each one finishes, so the total wait is about
+    the slowest single call.
     
     Args:
-        query: Original search query
-        num_variations: Number of alternative queries to generate
+        product_description: The product description provided by the user
+        results: Search results with 'hts_code', 'title' and 'normalized_text'
+        max_workers: Maximum concurrent LLM calls
+        model: OpenAI model to use
+        refresh: Skip the cache and regenerate every explanation
     
-    Returns:
-        List of alternative query strings
+    Yields:
+        (index into results, markdown explanation) in completion order
     """
-    
+    pending = []
+    for idx, r in enumerate(results):
+        cached = None if refresh else cached_explanation(product_description, r['hts_code'], model)
+        if cached is not None:
+            yield idx, cached
+        else:
+            pending.append(idx)
+
+    if not pending:
+        return
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pending)))) as pool:
+        futures = {
+            pool.submit(
+                explain_classification,
+                product_description=product_description,
+                hts_code=results[idx]['hts_code'],
+                hts_title=results[idx]['title'],
+                context=results[idx].get('normalized_text', ''),
+                model=model,
+                refresh=refresh,
+            ): idx
+            for idx in pending
+        }
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+# Variations are reused per distinct query (set VARIATION_CACHE=0 to disable)
+VARIATION_MODEL = os.environ.get("VARIATION_MODEL", "gpt-4o-mini")
+VARIATION_CACHE_ENABLED = os.environ.get("VARIATION_CACHE", "1") != "0"
+VARIATION_CACHE_MAX_ENTRIES = int(os.environ.get("VARIATION_CACHE_MAX_ENTRIES", "20000"))
+
+_variation_cache = None
+_variation_cache_lock = threading.Lock()
+
+
+def get_variation_cache() -> DiskCache | None:
+    """Return the shared search-variation cache, or None when disabled."""
+    global _variation_cache
+
+    if not VARIATION_CACHE_ENABLED:
+        return None
+
+    if _variation_cache is None:
+        with _variation_cache_lock:
+            if _variation_cache is None:
+                _variation_cache = DiskCache("variations", max_entries=VARIATION_CACHE_MAX_ENTRIES)
+    return _variation_cache
+
+
+def _variation_key(query: str, num_variations: int) -> str:
+    return make_key(normalize_query(query).lower(), VARIATION_MODEL, num_variations)
+
+
+def _variation_request(query: str, num_variations: int) -> dict:
     prompt = f"""Given this product search query: "{query}"
 
 Generate {num_variations} alternative ways to search for the same product in an HTS database.
@@ -111,30 +306,84 @@ Consider:
 
 Return ONLY the alternative queries, one per line, without numbering or explanation."""
 
+    return dict(
+        model=VARIATION_MODEL,
+        messages=[
+            {
+                "role": "system",
+                "content": "You are a search query optimization expert for HTS classification."
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ],
+        temperature=0.7,
+        max_tokens=200,
+    )
+
+
+def _parse_variations(response, num_variations: int) -> list[str]:
+    variations = response.choices[0].message.content.strip().split('\n')
+    # Clean up the variations
+    variations = [v.strip().strip('-').strip() for v in variations if v.strip()]
+    return variations[:num_variations]
+
+
+def _cached_variations(query: str, num_variations: int) -> list[str] | None:
+    cache = get_variation_cache()
+    blob = cache.get(_variation_key(query, num_variations)) if cache is not None else None
+    return json.loads(blob) if blob is not None else None
+
+
+def _store_variations(query: str, num_variations: int, variations: list[str]) -> None:
+    cache = get_variation_cache()
+    if cache is not None and variations:
+        cache.set(_variation_key(query, num_variations), json.dumps(variations).encode("utf-8"))
+
+
+def generate_search_variations(query: str, num_variations: int = 3) -> list[str]:
+    """
+    Generate alternative search queries to improve recall.
+    Used for multi-vector fallback when initial search has low confidence.
+    Results are cached per normalized query, so each distinct query costs
+    at most one LLM call.
+    
+    Args:
+        query: Original search query
+        num_variations: Number of alternative queries to generate
+    
+    Returns:
+        List of alternative query strings
+    """
+    cached = _cached_variations(query, num_variations)
+    if cached is not None:
+        return cached
+
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a search query optimization expert for HTS classification."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.7,
-            max_tokens=200,
-        )
-        
-        variations = response.choices[0].message.content.strip().split('\n')
-        # Clean up the variations
-        variations = [v.strip().strip('-').strip() for v in variations if v.strip()]
-        
-        return variations[:num_variations]
+        response = get_openai_client().chat.completions.create(**_variation_request(query, num_variations))
+        variations = _parse_variations(response, num_variations)
+        _store_variations(query, num_variations, variations)
+        return variations
         
     except Exception as e:
         print(f"Error generating search variations: {e}")
         # Fallback: return original query
         return [query]
+
+
+async def generate_search_variations_async(query: str, num_variations: int = 3) -> list[str]:
+    """Async version of generate_search_variations(), sharing its cache."""
+    cached = _cached_variations(query, num_variations)
+    if cached is not None:
+        return cached
+
+    try:
+        response = await get_async_openai_client().chat.completions.create(**_variation_request(query, num_variations))
+        variations = _parse_variations(response, num_variations)
+        _store_variations(query, num_variations, variations)
+        return variations
+
+    except Exception as e:
+        print(f"Error generating search variations: {e}")
+        return [query]
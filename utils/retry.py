@@ -0,0 +1,210 @@
+"""
+HTS Dashboard - Retry Policy
+
+Shared retry helpers for calls to Supabase and OpenAI:
+
+- exponential backoff with full jitter, so parallel workers do not retry
+  in lockstep
+- a total deadline per call, so a degraded backend cannot hold a request
+  for longer than the caller allows
+- retryable vs fatal error classification (bad requests, missing functions
+  and auth errors fail immediately)
+- a circuit breaker that fails fast while a backend is down
+"""
+
+import time
+import random
+import asyncio
+import threading
+from dataclasses import dataclass
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits, server errors
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+
+# Exception class names (httpx, httpcore, openai) that mean the request
+# never got a usable response
+RETRYABLE_ERROR_NAMES = {
+    "TimeoutException", "ConnectTimeout", "ReadTimeout", "WriteTimeout", "PoolTimeout",
+    "ConnectError", "ReadError", "WriteError", "RemoteProtocolError", "NetworkError",
+    "APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError",
+}
+
+TRANSIENT_MESSAGES = ("timeout", "timed out", "temporarily", "connection", "reset by peer", "unavailable")
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a backend whose circuit breaker is open."""
+
+
+def error_status(error: Exception) -> int | None:
+    """HTTP status carried by an SDK exception, if any."""
+    for attr in ("status_code", "status"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(error, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    True for errors that may succeed on another attempt (network failures,
+    timeouts, rate limits, 5xx). Other 4xx responses and programming errors
+    are fatal.
+    """
+    if isinstance(error, CircuitOpenError):
+        return False
+
+    status = error_status(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+
+    if any(cls.__name__ in RETRYABLE_ERROR_NAMES for cls in type(error).__mro__):
+        return True
+    if isinstance(error, (ConnectionError, TimeoutError, asyncio.TimeoutError)):
+        return True
+    if isinstance(error, (ValueError, TypeError, KeyError, AttributeError)):
+        return False
+
+    message = str(error).lower()
+    return any(marker in message for marker in TRANSIENT_MESSAGES)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    max_attempts: total tries, including the first one
+    base_delay / max_delay: backoff bounds in seconds
+    deadline: total seconds allowed across all attempts (None = no limit)
+    """
+    max_attempts: int = 3
+    base_delay: float = 0.2
+    max_delay: float = 2.0
+    deadline: float | None = None
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter delay before retry number `attempt` (0-based)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def remaining(self, started: float) -> float | None:
+        """Seconds left before the deadline (None = no limit)."""
+        if self.deadline is None:
+            return None
+        return max(self.deadline - (time.monotonic() - started), 0.001)
+
+    def next_delay(self, attempt: int, started: float) -> float | None:
+        """
+        Delay before the next attempt, or None when no attempt is left or the
+        deadline would pass before it could start.
+        """
+        if attempt >= self.max_attempts - 1:
+            return None
+        delay = self.backoff(attempt)
+        if self.deadline is not None and time.monotonic() - started + delay >= self.deadline:
+            return None
+        return delay
+
+
+def retry_call(fn, *args, policy: RetryPolicy = RetryPolicy(), label: str = "call",
+               retryable=is_retryable, timeout_arg: str | None = None, **kwargs):
+    """
+    Call fn(*args, **kwargs), retrying retryable errors under `policy`.
+    The last error is re-raised once attempts or the deadline run out.
+
+    A running sync call cannot be cancelled, so with a deadline set, name
+    fn's timeout keyword in `timeout_arg` to have each attempt receive the
+    seconds left before the deadline.
+    """
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        try:
+            if timeout_arg is not None and policy.deadline is not None:
+                kwargs[timeout_arg] = policy.remaining(started)
+            return fn(*args, **kwargs)
+        except Exception as e:
+            delay = policy.next_delay(attempt, started) if retryable(e) else None
+            if delay is None:
+                raise
+            print(f"⚠️ [{label}] attempt {attempt + 1} failed: {e}. Retrying in {delay:.2f}s...")
+            time.sleep(delay)
+            attempt += 1
+
+
+async def retry_call_async(fn, *args, policy: RetryPolicy = RetryPolicy(), label: str = "call",
+                           retryable=is_retryable, **kwargs):
+    """
+    Async version of retry_call() for coroutine functions. An attempt still
+    running when the deadline passes is cancelled with a TimeoutError.
+    """
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        try:
+            if policy.deadline is None:
+                return await fn(*args, **kwargs)
+            return await asyncio.wait_for(fn(*args, **kwargs), policy.remaining(started))
+        except Exception as e:
+            delay = policy.next_delay(attempt, started) if retryable(e) else None
+            if delay is None:
+                raise
+            print(f"⚠️ [{label}] attempt {attempt + 1} failed: {e}. Retrying in {delay:.2f}s...")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls
+    for `reset_seconds`. After that one trial call is let through: success
+    closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        """True when a call may go to the backend."""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def check(self) -> None:
+        """Raise CircuitOpenError unless a call may go to the backend."""
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} is unavailable (circuit open); retry in a few seconds")
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self._trial_running:
+                    print(f"🔌 {self.name} circuit opened after {self.failures} failures")
+                self.opened_at = time.monotonic()
+            self._trial_running = False
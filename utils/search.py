@@ -1,88 +1,411 @@
 import os
-import time
-from supabase import create_client, Client
-from utils.embeddings import embed_text
-from dotenv import load_dotenv
-
-# Try to load env vars from common locations
-load_dotenv()
-load_dotenv(".hts_dashboard/.env")
-
-# Supabase configuration
-SUPABASE_URL = os.environ.get("SUPABASE_URL")
-SUPABASE_SERVICE_ROLE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.clients import get_rest_client, get_supabase_client
+from utils.embeddings import embed_text, embed_texts
+from utils.llm_explain import generate_search_variations
+from utils import snapshot
+from utils.retry import CircuitBreaker, CircuitOpenError, RetryPolicy, is_retryable, retry_call
+from utils.telemetry import timed
+
+# Supabase configuration (credentials are read by utils.clients)
 SUPABASE_TABLE = os.environ.get("SUPABASE_TABLE", "hts_knowledge_chunks")
 SUPABASE_MATCH_RPC = os.environ.get("SUPABASE_MATCH_RPC", "match_hts_chunks")
+# "rpc" queries pgvector through SUPABASE_MATCH_RPC, "local" uses the in-process index
+SEARCH_BACKEND = os.environ.get("SEARCH_BACKEND", "rpc").lower()
+# "hybrid" fuses vector and keyword results, "vector" uses embeddings only
+SEARCH_MODE = os.environ.get("SEARCH_MODE", "hybrid").lower()
+# "1" runs searches through the asyncio pipeline in utils.async_search
+SEARCH_ASYNC = os.environ.get("SEARCH_ASYNC", "1") != "0"
+# Reciprocal rank fusion constant (60 is the value from the original RRF paper)
+RRF_K = int(os.environ.get("RRF_K", "60"))
+
+# Multi-query expansion: "auto" re-searches with LLM rewrites of the query
+# when the best vector match is below SEARCH_EXPANSION_THRESHOLD, "always"
+# does it for every query, "off" never does. text-embedding-3-small puts
+# good matches at roughly 0.3-0.5 cosine similarity, so the threshold sits
+# at the bottom of that band
+SEARCH_EXPANSION = os.environ.get("SEARCH_EXPANSION", "auto").lower()
+SEARCH_EXPANSION_THRESHOLD = float(os.environ.get("SEARCH_EXPANSION_THRESHOLD", "0.3"))
+SEARCH_EXPANSION_VARIATIONS = int(os.environ.get("SEARCH_EXPANSION_VARIATIONS", "3"))
+# Retry budget for one vector search: attempts and total seconds across them
+SEARCH_RETRY_ATTEMPTS = int(os.environ.get("SEARCH_RETRY_ATTEMPTS", "3"))
+SEARCH_DEADLINE_SECONDS = float(os.environ.get("SEARCH_DEADLINE_SECONDS", "3"))
+# Consecutive failed searches before the RPC backend is skipped for a while
+SEARCH_BREAKER_THRESHOLD = int(os.environ.get("SEARCH_BREAKER_THRESHOLD", "3"))
+SEARCH_BREAKER_RESET_SECONDS = float(os.environ.get("SEARCH_BREAKER_RESET_SECONDS", "30"))
+
+rpc_breaker = CircuitBreaker(
+    "Supabase vector search",
+    failure_threshold=SEARCH_BREAKER_THRESHOLD,
+    reset_seconds=SEARCH_BREAKER_RESET_SECONDS,
+)
+
+# Runs the keyword lookup while the query is being embedded
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="hts-search")
+
+
+class RPCError(Exception):
+    """A PostgREST call that returned an error status."""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(f"{status_code}: {message}")
+        self.status_code = status_code
 
-# Initialize Supabase client
-if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
-    # This will be caught by the app, but we print for logs
-    print("❌ ERROR: Supabase credentials missing in utils/search.py")
-    supabase = None
-else:
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
 
+def search_retry_policy(max_retries=SEARCH_RETRY_ATTEMPTS):
+    return RetryPolicy(max_attempts=max_retries, base_delay=0.2, max_delay=1.0, deadline=SEARCH_DEADLINE_SECONDS)
 
-def semantic_query(vector, limit=5, max_retries=3):
+
+def semantic_query(vector, limit=5, max_retries=SEARCH_RETRY_ATTEMPTS, code_prefix=None, min_similarity=None):
     """
     Query Supabase RPC function with vector similarity search.
+
+    code_prefix (e.g. "39" or "8471.30") and min_similarity are applied inside
+    the index scan, so up to `limit` rows that pass them come back in one call.
+    Transient errors are retried with jittered backoff within
+    SEARCH_DEADLINE_SECONDS, and each attempt's HTTP timeout is the time
+    left before that deadline; configuration errors fail immediately.
     """
-    if not supabase:
+    client = get_rest_client()
+    if client is None:
         raise Exception("Supabase client not initialized. Check your environment variables.")
 
-    last_error = None
-    
-    for attempt in range(max_retries):
+    params = rpc_params(vector, limit, code_prefix, min_similarity)
+
+    def call(timeout=None):
+        response = client.post(f"/rpc/{SUPABASE_MATCH_RPC}", json=params, timeout=timeout)
+        if response.is_error:
+            raise RPCError(response.status_code, response.text)
+        return response.json() or []
+
+    try:
+        return retry_call(
+            call,
+            policy=search_retry_policy(max_retries),
+            label="RPC search",
+            retryable=lambda e: rpc_config_error(e, vector) is None and is_retryable(e),
+            timeout_arg="timeout",
+        )
+    except Exception as e:
+        # Check for common configuration issues
+        config_error = rpc_config_error(e, vector)
+        if config_error:
+            raise config_error from e
+        print(f"❌ RPC search failed: {str(e)}")
+        raise
+
+
+def rpc_params(vector, limit=5, code_prefix=None, min_similarity=None):
+    """
+    Build the named arguments for SUPABASE_MATCH_RPC.
+    Alphabetical: code_prefix, match_count, min_similarity, query_embedding
+    """
+    params = {
+        "match_count": int(limit),
+        "query_embedding": vector,
+    }
+    # Only send filters that are set, so older function versions still work
+    if code_prefix:
+        params["code_prefix"] = code_prefix
+    if min_similarity is not None:
+        params["min_similarity"] = float(min_similarity)
+    return params
+
+
+def rpc_config_error(error, vector):
+    """
+    Translate RPC errors caused by a misconfigured database into a readable
+    exception. Returns None for errors that may be transient.
+    """
+    err_msg = str(error).lower()
+    if "could not find the function" in err_msg or "schema cache" in err_msg:
+        return Exception(
+            f"RPC function '{SUPABASE_MATCH_RPC}' not found in Supabase. "
+            f"Please run the SQL script 'supabase_rpc_fix.sql' in your Supabase SQL Editor. "
+            "This is the most likely cause of search failure."
+        )
+
+    if "dimensions of vector do not match" in err_msg:
+        return Exception(
+            f"Vector dimension mismatch. Check your EMBEDDING_DIM and 'vector(XXXX)' in SQL. "
+            f"Current vector length: {len(vector)}"
+        )
+
+    return None
+
+
+_local_index = None
+_local_index_lock = threading.Lock()
+
+
+def get_local_index():
+    """
+    Return the in-process vector index, loading it on first use.
+
+    The index is read from LOCAL_INDEX_PATH when present, otherwise it is
+    built from Supabase once and written there for the next start.
+    """
+    global _local_index
+
+    if _local_index is not None:
+        return _local_index
+
+    with _local_index_lock:
+        if _local_index is None:
+            from utils.vector_index import LocalVectorIndex, LOCAL_INDEX_PATH
+
+            if os.path.exists(LOCAL_INDEX_PATH):
+                index = LocalVectorIndex.load(LOCAL_INDEX_PATH)
+            else:
+                supabase = get_supabase_client()
+                if not supabase:
+                    raise Exception("Supabase client not initialized. Check your environment variables.")
+                print(f"⏳ Building local vector index from '{SUPABASE_TABLE}'...")
+                index = LocalVectorIndex.from_supabase(supabase, SUPABASE_TABLE)
+                index.save(LOCAL_INDEX_PATH)
+
+            print(f"✅ Local vector index ready ({len(index)} rows)")
+            _local_index = index
+
+    return _local_index
+
+
+def local_fallback_available():
+    """True when a saved local index can stand in for the RPC backend."""
+    from utils.vector_index import LOCAL_INDEX_PATH
+
+    return _local_index is not None or os.path.exists(LOCAL_INDEX_PATH)
+
+
+def rpc_unavailable(error):
+    """
+    Record a failed RPC search on the circuit breaker. Returns True when the
+    caller should answer from the local index instead of raising.
+    """
+    if isinstance(error, CircuitOpenError) or is_retryable(error):
+        if not isinstance(error, CircuitOpenError):
+            rpc_breaker.record_failure()
+        if local_fallback_available():
+            print(f"↪️ Vector search falling back to the local index: {str(error)}")
+            return True
+    return False
+
+
+def vector_search(vector, limit=5, code_prefix=None, min_similarity=None):
+    """
+    Run a similarity search against the configured SEARCH_BACKEND.
+
+    While the RPC backend is failing, its circuit breaker skips it and the
+    local index (when one has been saved) answers instead.
+    """
+    if SEARCH_BACKEND == "local":
+        return get_local_index().search(vector, limit, code_prefix=code_prefix, min_similarity=min_similarity)
+
+    try:
+        rpc_breaker.check()
+        hits = semantic_query(vector, limit, code_prefix=code_prefix, min_similarity=min_similarity)
+    except Exception as e:
+        if rpc_unavailable(e):
+            return get_local_index().search(vector, limit, code_prefix=code_prefix, min_similarity=min_similarity)
+        if not isinstance(e, CircuitOpenError) and not is_retryable(e):
+            # The backend answered (e.g. a bad request), so it is not down
+            rpc_breaker.record_success()
+        raise
+
+    rpc_breaker.record_success()
+    return hits
+
+
+def dotted_prefix(digits: str) -> str:
+    """'847130' -> '8471.30', matching how codes are stored in the table."""
+    groups = [digits[:4]] + [digits[i:i + 2] for i in range(4, len(digits), 2)]
+    return ".".join(g for g in groups if g)
+
+
+def exact_code_search(query, limit=5, code_prefix=None):
+    """
+    Look up rows whose HTS number starts with the code typed in `query`.
+    No embedding is needed, so these results skip the OpenAI call. Rows
+    carry similarity=None: a code match has no semantic score.
+    """
+    digits = snapshot.code_digits(query)
+    prefix = snapshot.code_digits(code_prefix)
+    if prefix and not digits.startswith(prefix):
+        if not prefix.startswith(digits):
+            return []
+        digits = prefix
+
+    if snapshot.snapshot_available():
+        rows = snapshot.code_prefix_search(digits, limit)
+    else:
+        # Only needed when the snapshot cannot answer
+        supabase = get_supabase_client()
+        rows = []
+        if supabase:
+            rows = supabase.table(SUPABASE_TABLE)\
+                .select("id, hts_code, title, normalized_text")\
+                .like("hts_code", f"{dotted_prefix(digits)}%")\
+                .order("hts_code")\
+                .limit(limit)\
+                .execute().data or []
+
+    return [{**row, "similarity": None, "match_source": "code"} for row in rows]
+
+
+def keyword_search(query, limit=5, code_prefix=None):
+    """
+    BM25 keyword matches from the local snapshot ([] when there is none).
+    BM25 scores are not comparable to cosine similarity, so rows carry
+    similarity=None.
+    """
+    if not snapshot.snapshot_available():
+        return []
+    try:
+        rows = snapshot.keyword_search(query, limit, code_prefix=code_prefix or "")
+    except Exception as e:
+        print(f"⚠️ Keyword search failed: {str(e)}")
+        return []
+    return [{**row, "similarity": None, "match_source": "keyword"} for row in rows]
+
+
+def reciprocal_rank_fusion(result_lists, limit=5, k=RRF_K, min_similarity=None):
+    """
+    Merge ranked result lists by summing 1 / (k + rank) per row.
+    The first list's fields win when a row appears twice, except that a
+    vector similarity is kept over a missing one.
+
+    With min_similarity set, rows without a similarity (found only by
+    keyword search) are dropped, since they cannot be checked against it.
+    """
+    scores = {}
+    merged = {}
+
+    for results in result_lists:
+        for rank, row in enumerate(results, start=1):
+            row_id = row["id"]
+            scores[row_id] = scores.get(row_id, 0.0) + 1.0 / (k + rank)
+            if row_id in merged:
+                first = merged[row_id]
+                similarity = first.get("similarity")
+                if similarity is None:
+                    similarity = row.get("similarity")
+                merged[row_id] = {**row, **first, "similarity": similarity, "match_source": "hybrid"}
+            else:
+                merged[row_id] = row
+
+    ranked = sorted(merged, key=lambda row_id: scores[row_id], reverse=True)
+    if min_similarity is not None:
+        ranked = [row_id for row_id in ranked if merged[row_id].get("similarity") is not None]
+    return [{**merged[row_id], "rrf_score": scores[row_id]} for row_id in ranked[:limit]]
+
+
+def top_similarity(results):
+    return max((r.get("similarity") or 0.0 for r in results), default=0.0)
+
+
+def needs_expansion(vector_hits, expand=None):
+    """Whether a query's vector results are weak enough to expand it."""
+    expand = (expand or SEARCH_EXPANSION).lower()
+    if expand == "always":
+        return True
+    if expand == "off":
+        return False
+    return top_similarity(vector_hits) < SEARCH_EXPANSION_THRESHOLD
+
+
+def expanded_vector_search(query, limit=5, code_prefix=None, min_similarity=None):
+    """
+    Vector-search LLM rewrites of `query`. The variations are embedded in
+    one batched call and searched concurrently; returns one ranked list per
+    variation.
+    """
+    variations = [v for v in generate_search_variations(query, SEARCH_EXPANSION_VARIATIONS) if v != query]
+    if not variations:
+        return []
+
+    vectors = embed_texts(variations)
+    futures = [
+        _executor.submit(vector_search, vector, limit, code_prefix, min_similarity)
+        for vector in vectors
+    ]
+
+    result_lists = []
+    for future in futures:
         try:
-            # Call RPC with explicit parameter names
-            # Alphabetical: match_count (m) comes before query_embedding (q)
-            response = supabase.rpc(
-                SUPABASE_MATCH_RPC,
-                {
-                    "match_count": int(limit),
-                    "query_embedding": vector,
-                }
-            ).execute()
-            
-            return response.data if response.data else []
-            
+            result_lists.append(future.result())
         except Exception as e:
-            last_error = e
-            print(f"⚠️ RPC attempt {attempt + 1} failed: {str(e)}")
-            
-            # Check for common configuration issues
-            err_msg = str(e).lower()
-            if "could not find the function" in err_msg or "schema cache" in err_msg:
-                raise Exception(
-                    f"RPC function '{SUPABASE_MATCH_RPC}' not found in Supabase. "
-                    f"Please run the SQL script 'supabase_rpc_fix.sql' in your Supabase SQL Editor. "
-                    "This is the most likely cause of search failure."
-                ) from e
-            
-            if "dimensions of vector do not match" in err_msg:
-                raise Exception(
-                    f"Vector dimension mismatch. Check your EMBEDDING_DIM and 'vector(XXXX)' in SQL. "
-                    f"Current vector length: {len(vector)}"
-                ) from e
-
-            # Retry on other errors (transient connection issues, etc.)
-            if attempt < max_retries - 1:
-                time.sleep(1)
-            else:
-                # Last attempt failed, raise with full context
-                print(f"❌ RPC search failed after {max_retries} attempts.")
-                raise e
-    
-    return []
+            print(f"⚠️ Expanded search failed: {str(e)}")
+    return result_lists
+
 
+def _timed_call(trace, stage, fn, *args):
+    with timed(trace, stage):
+        return fn(*args)
 
-def semantic_search_hts(query, limit=5):
+
+def semantic_search_hts(query, limit=5, mode=None, code_prefix=None, min_similarity=None, expand=None, trace=None):
     """
     Perform semantic search on HTS knowledge base.
+
+    Queries that look like an HTS number go straight to a code prefix lookup.
+    In hybrid mode the keyword lookup runs concurrently with the embedding
+    and vector search, and both rankings are fused with RRF. With
+    SEARCH_ASYNC enabled this is a blocking wrapper around
+    utils.async_search.semantic_search_async.
+
+    code_prefix restricts results to a chapter/heading (e.g. "39", "8471.30");
+    min_similarity is a floor on vector similarity. Both are applied by the
+    search backend rather than by filtering afterwards.
+
+    When the best vector match is weak (see needs_expansion), the query is
+    also searched as several LLM-generated variations and every ranking is
+    fused with RRF. `expand` overrides SEARCH_EXPANSION per call.
+
+    Pass a dict as `trace` to get per-stage latencies in ms under
+    trace["stages"] and whether the query embedding was cached under
+    trace["cache_hit"], for utils.analytics.log_search.
     """
+    if SEARCH_ASYNC:
+        from utils.async_search import run_sync, semantic_search_async
+
+        return run_sync(semantic_search_async(
+            query, limit, mode=mode, code_prefix=code_prefix, min_similarity=min_similarity, expand=expand,
+            trace=trace,
+        ))
+
+    mode = (mode or SEARCH_MODE).lower()
+    if code_prefix:
+        code_prefix = dotted_prefix(snapshot.code_digits(code_prefix)) or None
+
     try:
-        vec = embed_text(query)
-        return semantic_query(vec, limit)
+        if snapshot.looks_like_code(query):
+            with timed(trace, "code"):
+                hits = exact_code_search(query, limit, code_prefix=code_prefix)
+            if hits:
+                return hits
+
+        # Fetch deeper candidate lists so fusion has something to work with
+        depth = max(limit * 2, 10) if mode == "hybrid" else limit
+        keyword_future = None
+        if mode == "hybrid":
+            keyword_future = _executor.submit(_timed_call, trace, "keyword", keyword_search, query, depth, code_prefix)
+        with timed(trace, "embed"):
+            vector = embed_text(query, trace)
+        with timed(trace, "vector"):
+            vector_hits = vector_search(vector, depth, code_prefix=code_prefix, min_similarity=min_similarity)
+
+        result_lists = [vector_hits]
+        if needs_expansion(vector_hits, expand):
+            with timed(trace, "expansion"):
+                result_lists += expanded_vector_search(query, depth, code_prefix, min_similarity)
+
+        if keyword_future is not None:
+            result_lists.append(keyword_future.result())
+
+        if len(result_lists) == 1:
+            return vector_hits
+        return reciprocal_rank_fusion(result_lists, limit, min_similarity=min_similarity)
     except Exception as e:
         # Re-raise to show in Streamlit UI
         raise e
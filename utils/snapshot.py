@@ -0,0 +1,310 @@
+"""
+HTS Dashboard - Local HTS Snapshot
+
+A read-only SQLite copy of the HTS table (id, hts_code, title,
+normalized_text) for the browse pages. Rows are stored in display order
+(hts_code, id) under a dense position key, so any page is a single
+primary-key range read with no network round trip. An FTS5 index over the
+same rows provides BM25-ranked keyword search.
+"""
+
+import os
+import re
+import time
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+SNAPSHOT_PATH = os.environ.get("SNAPSHOT_PATH", ".hts_cache/hts_snapshot.sqlite")
+
+# PostgREST caps responses at 1000 rows by default
+FETCH_PAGE_SIZE = 1000
+
+_conn = None
+_conn_mtime = None
+_conn_lock = threading.Lock()
+
+
+def code_digits(hts_code: str | None) -> str:
+    """'3923.30.00' -> '39233000', used for dot-insensitive prefix lookups."""
+    return "".join(ch for ch in (hts_code or "") if ch.isdigit())
+
+
+def _fetch_all(client, table: str, columns: str, **filters) -> list[dict]:
+    rows = []
+    last_id = 0
+    while True:
+        query = client.table(table).select(columns).gt("id", last_id)
+        for column, value in filters.items():
+            query = query.is_(column, value)
+        batch = query.order("id").limit(FETCH_PAGE_SIZE).execute().data or []
+        if not batch:
+            return rows
+        rows.extend(batch)
+        last_id = batch[-1]["id"]
+
+
+def sync_snapshot(client, table: str, path: str = SNAPSHOT_PATH) -> dict:
+    """
+    Download the HTS table from Supabase and atomically replace the local
+    snapshot. Returns the new snapshot metadata.
+    """
+    start = time.time()
+    rows = _fetch_all(client, table, "id, hts_code, title, normalized_text")
+    missing = {r["id"] for r in _fetch_all(client, table, "id", embedding="null")}
+    rows.sort(key=lambda r: (r.get("hts_code") or "", r["id"]))
+
+    digest = hashlib.sha256()
+    for r in rows:
+        digest.update(f"{r['id']}\x1f{r.get('hts_code')}\x1f{r.get('title')}\x1f{r.get('normalized_text')}\x1e".encode("utf-8"))
+
+    meta = {
+        "version": digest.hexdigest()[:16],
+        "synced_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "row_count": str(len(rows)),
+        "source_table": table,
+    }
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(
+            """
+            CREATE TABLE hts_rows (
+                pos INTEGER PRIMARY KEY,
+                id INTEGER NOT NULL,
+                hts_code TEXT,
+                code_digits TEXT,
+                title TEXT,
+                normalized_text TEXT,
+                has_embedding INTEGER NOT NULL
+            );
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+            """
+        )
+        conn.executemany(
+            "INSERT INTO hts_rows VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                (pos, r["id"], r.get("hts_code"), code_digits(r.get("hts_code")),
+                 r.get("title"), r.get("normalized_text"), int(r["id"] not in missing))
+                for pos, r in enumerate(rows)
+            ),
+        )
+        conn.execute("CREATE INDEX hts_rows_code_digits ON hts_rows (code_digits)")
+        conn.execute("CREATE INDEX hts_rows_id ON hts_rows (id)")
+
+        # Inverted keyword index over the same rows, ranked with bm25()
+        conn.execute(
+            "CREATE VIRTUAL TABLE hts_fts USING fts5("
+            "hts_code, title, normalized_text, content='hts_rows', content_rowid='pos')"
+        )
+        conn.execute("INSERT INTO hts_fts(hts_fts) VALUES ('rebuild')")
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", meta.items())
+        conn.commit()
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, path)
+    print(f"✅ Snapshot {meta['version']} written to {path} ({len(rows)} rows in {time.time() - start:.1f}s)")
+    return meta
+
+
+def snapshot_available(path: str = SNAPSHOT_PATH) -> bool:
+    return os.path.exists(path)
+
+
+def _connection(path: str = SNAPSHOT_PATH) -> sqlite3.Connection:
+    """
+    Shared read-only connection, reopened when the snapshot file is replaced.
+    Callers must hold _conn_lock.
+    """
+    global _conn, _conn_mtime
+
+    mtime = os.path.getmtime(path)
+    if _conn is None or _conn_mtime != mtime:
+        if _conn is not None:
+            _conn.close()
+        _conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        _conn.row_factory = sqlite3.Row
+        _conn_mtime = mtime
+    return _conn
+
+
+def _query(sql: str, params: tuple = ()) -> list[dict]:
+    with _conn_lock:
+        return [dict(row) for row in _connection().execute(sql, params).fetchall()]
+
+
+def snapshot_info() -> dict:
+    """Return the snapshot's version stamp, sync time and row count."""
+    return {row["key"]: row["value"] for row in _query("SELECT key, value FROM meta")}
+
+
+def count_rows() -> int:
+    return int(snapshot_info().get("row_count", 0))
+
+
+ROW_COLUMNS = "id, hts_code, title, normalized_text, has_embedding"
+
+
+def get_page(page: int = 1, page_size: int = 20) -> list[dict]:
+    """Get one page of rows in (hts_code, id) order."""
+    start = (page - 1) * page_size
+    return _query(
+        f"SELECT {ROW_COLUMNS} FROM hts_rows WHERE pos >= ? AND pos < ? ORDER BY pos",
+        (start, start + page_size),
+    )
+
+
+# bm25() column weights: hts_code, title, normalized_text
+BM25_WEIGHTS = (5.0, 3.0, 1.0)
+
+_CODE_QUERY = re.compile(r"^\d[\d.\s]*$")
+
+
+def looks_like_code(text: str) -> bool:
+    """True for inputs such as '3923', '8471.30' or '0101 21'."""
+    return bool(_CODE_QUERY.match(text.strip())) and len(code_digits(text)) >= 2
+
+
+def _prefix_range(prefix: str) -> tuple[str, str]:
+    """[low, high) bounds matching every string that starts with `prefix`."""
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _fts_expression(text: str, operator: str) -> str:
+    """Quote each word for FTS5; the last one also matches as a prefix."""
+    words = re.findall(r"\w+", text)
+    if not words:
+        return ""
+    terms = [f'"{w}"' for w in words[:-1]] + [f'"{words[-1]}"*']
+    return f" {operator} ".join(terms)
+
+
+def _has_fts() -> bool:
+    rows = _query("SELECT name FROM sqlite_master WHERE name = 'hts_fts'")
+    return bool(rows)
+
+
+def code_prefix_search(prefix: str, limit: int = 50) -> list[dict]:
+    """Rows whose HTS number starts with `prefix` (dots ignored), in code order."""
+    digits = code_digits(prefix)
+    if not digits:
+        return []
+    low, high = _prefix_range(digits)
+    return _query(
+        f"SELECT {ROW_COLUMNS} FROM hts_rows WHERE code_digits >= ? AND code_digits < ? ORDER BY pos LIMIT ?",
+        (low, high, limit),
+    )
+
+
+def code_children(prefix: str = "") -> list[dict]:
+    """
+    The next level of HTS numbers below `prefix` (dots ignored): chapters
+    for an empty prefix, otherwise the shortest numbers under the prefix
+    that have no other number between them and it. Each row carries
+    `hts_code`, `title` and `count`, the number of codes below it.
+    """
+    digits = code_digits(prefix)
+    if not digits:
+        rows = _query(
+            "SELECT substr(code_digits, 1, 2) AS chapter, COUNT(DISTINCT code_digits) AS count "
+            "FROM hts_rows WHERE code_digits != '' GROUP BY chapter ORDER BY chapter"
+        )
+        return [{"hts_code": r["chapter"], "title": f"Chapter {r['chapter']}", "count": r["count"]} for r in rows]
+
+    low, high = _prefix_range(digits)
+    # Bare pos/hts_code/title columns come from the MIN(pos) row
+    rows = _query(
+        "SELECT code_digits, hts_code, title, MIN(pos) AS pos FROM hts_rows "
+        "WHERE code_digits > ? AND code_digits < ? GROUP BY code_digits ORDER BY code_digits",
+        (low, high),
+    )
+
+    # Sorted order puts every number right before its descendants
+    children = []
+    for row in rows:
+        if children and row["code_digits"].startswith(children[-1]["digits"]):
+            children[-1]["count"] += 1
+            continue
+        children.append({"digits": row["code_digits"], "hts_code": row["hts_code"], "title": row["title"], "count": 0})
+
+    for child in children:
+        del child["digits"]
+    return children
+
+
+def keyword_search(text: str, limit: int = 50, code_prefix: str = "") -> list[dict]:
+    """
+    BM25-ranked keyword search. All words must match; if nothing does, any
+    word may match. Each row gets a `score` (higher is better).
+    """
+    clauses, params = [], []
+    digits = code_digits(code_prefix)
+    if digits:
+        clauses.append("r.code_digits >= ? AND r.code_digits < ?")
+        params += list(_prefix_range(digits))
+    extra = "".join(f" AND {c}" for c in clauses)
+
+    for operator in ("AND", "OR"):
+        expression = _fts_expression(text, operator)
+        if not expression:
+            return []
+
+        rows = _query(
+            f"SELECT r.id, r.hts_code, r.title, r.normalized_text, r.has_embedding, "
+            f"-bm25(hts_fts, {', '.join(str(w) for w in BM25_WEIGHTS)}) AS score "
+            f"FROM hts_fts JOIN hts_rows r ON r.pos = hts_fts.rowid "
+            f"WHERE hts_fts MATCH ?{extra} ORDER BY score DESC LIMIT ?",
+            (expression, *params, limit),
+        )
+        if rows:
+            return rows
+
+    return []
+
+
+def search_rows(
+    text: str = "",
+    code_prefix: str = "",
+    chapter: str = "",
+    limit: int = 50,
+) -> list[dict]:
+    """
+    Search backing the Chunk Browser page. Code-like text becomes an HTS
+    number prefix lookup, other text a BM25 keyword search; the code and
+    chapter filters are prefix matches on the HTS number.
+    """
+    prefix = code_digits(code_prefix) or code_digits(chapter)
+    if code_prefix and chapter and not code_digits(code_prefix).startswith(code_digits(chapter)):
+        return []
+
+    text = text.strip()
+    if text and looks_like_code(text):
+        digits = code_digits(text)
+        if prefix and not (digits.startswith(prefix) or prefix.startswith(digits)):
+            return []
+        return code_prefix_search(max(digits, prefix, key=len), limit)
+
+    if text and _has_fts():
+        return keyword_search(text, limit, code_prefix=prefix)
+
+    clauses, params = [], []
+    if text:
+        # Snapshots synced before the keyword index existed
+        clauses.append("(hts_code LIKE ? OR title LIKE ? OR normalized_text LIKE ?)")
+        params += [f"%{text}%"] * 3
+    if prefix:
+        clauses.append("code_digits >= ? AND code_digits < ?")
+        params += list(_prefix_range(prefix))
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    return _query(f"SELECT {ROW_COLUMNS} FROM hts_rows {where} ORDER BY pos LIMIT ?", (*params, limit))
@@ -1,29 +1,22 @@
 # utils/supabase_db.py
 
 import os
-from supabase import create_client, Client
-from openai import OpenAI
-from dotenv import load_dotenv
+from utils.clients import get_supabase_client
 
-load_dotenv()
-
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 SUPABASE_TABLE = os.getenv("SUPABASE_TABLE", "hts_knowledge_chunks")
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
-client = OpenAI(api_key=OPENAI_API_KEY)
-
 
 def get_all_chunks(limit=50):
     """Get all chunks from the database with a limit."""
-    return supabase.table(SUPABASE_TABLE).select("*").limit(limit).execute()
+    return get_supabase_client().table(SUPABASE_TABLE).select("*").limit(limit).execute()
 
 
 def get_hts_page(page: int = 1, page_size: int = 20):
     """
     Get a paginated list of HTS codes from the database.
+
+    Uses OFFSET, so it is only meant for jumping straight to an arbitrary
+    page. Sequential paging should use get_hts_page_after().
     
     Args:
         page: Page number (1-indexed)
@@ -35,9 +28,10 @@ def get_hts_page(page: int = 1, page_size: int = 20):
     offset = (page - 1) * page_size
     
     try:
-        response = supabase.table(SUPABASE_TABLE)\
+        response = get_supabase_client().table(SUPABASE_TABLE)\
             .select("id, hts_code, title, normalized_text")\
             .order("hts_code")\
+            .order("id")\
             .range(offset, offset + page_size - 1)\
             .execute()
         
@@ -47,6 +41,54 @@ def get_hts_page(page: int = 1, page_size: int = 20):
         return []
 
 
+def get_hts_page_after(cursor: tuple | None = None, page_size: int = 20):
+    """
+    Get the page of HTS codes that follows `cursor` (keyset pagination).
+
+    Rows are ordered by (hts_code, id). Seeking past the cursor lets Postgres
+    start from the index position directly, so the last page costs the same
+    as the first.
+
+    Args:
+        cursor: (hts_code, id) of the last row already shown, or None for the start
+        page_size: Number of results per page
+
+    Returns:
+        Tuple of (rows, next_cursor). next_cursor is None after the last page.
+    """
+    try:
+        query = get_supabase_client().table(SUPABASE_TABLE)\
+            .select("id, hts_code, title, normalized_text")
+
+        if cursor is not None:
+            code, row_id = cursor
+            # The gte bound gives Postgres a start key on the (hts_code, id)
+            # index; the OR alone is only a filter applied while scanning
+            query = query\
+                .gte("hts_code", code)\
+                .or_(f'hts_code.gt."{code}",and(hts_code.eq."{code}",id.gt.{int(row_id)})')
+
+        response = query\
+            .order("hts_code")\
+            .order("id")\
+            .limit(page_size)\
+            .execute()
+
+        rows = response.data if response.data else []
+    except Exception as e:
+        print(f"Error fetching HTS page: {e}")
+        return [], None
+
+    return rows, page_cursor(rows, page_size)
+
+
+def page_cursor(rows: list, page_size: int):
+    """Cursor pointing after the last row of a page, or None if it was the last page."""
+    if len(rows) < page_size:
+        return None
+    return (rows[-1]["hts_code"], rows[-1]["id"])
+
+
 def count_hts_rows():
     """
     Count the total number of HTS codes in the database.
@@ -56,7 +98,7 @@ def count_hts_rows():
     """
     try:
         # Supabase doesn't have a direct count, so we use select with count
-        response = supabase.table(SUPABASE_TABLE)\
+        response = get_supabase_client().table(SUPABASE_TABLE)\
             .select("id", count="exact")\
             .limit(1)\
             .execute()
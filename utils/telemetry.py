@@ -0,0 +1,272 @@
+"""
+HTS Dashboard - Search Telemetry
+
+An append-only log of searches and classifications in a local SQLite file.
+Each event records the query, total and per-stage latency, the result
+codes, the top similarity and whether the query embedding came from cache.
+
+record() only puts the event on an in-memory queue, so logging adds no
+latency to the search path. A background thread drains the queue and
+writes events in batches; when the queue is full new events are dropped
+rather than blocking the caller.
+"""
+
+import os
+import json
+import time
+import queue
+import atexit
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+TELEMETRY_ENABLED = os.environ.get("TELEMETRY", "1") != "0"
+TELEMETRY_DB_PATH = os.environ.get("TELEMETRY_DB_PATH", ".hts_cache/telemetry.sqlite")
+# Events per INSERT batch, and the longest an event waits to be written
+TELEMETRY_BATCH_SIZE = int(os.environ.get("TELEMETRY_BATCH_SIZE", "50"))
+TELEMETRY_FLUSH_SECONDS = float(os.environ.get("TELEMETRY_FLUSH_SECONDS", "2"))
+TELEMETRY_QUEUE_SIZE = int(os.environ.get("TELEMETRY_QUEUE_SIZE", "10000"))
+
+EVENT_COLUMNS = (
+    "ts", "kind", "query", "latency_ms", "stages", "result_codes",
+    "result_count", "top_similarity", "cache_hit", "error",
+)
+
+# Queue marker that tells the writer thread to flush and exit
+_STOP = object()
+
+_sink = None
+_sink_lock = threading.Lock()
+
+
+@contextmanager
+def timed(trace: dict | None, stage: str):
+    """
+    Add the time spent in the block to trace["stages"][stage] in ms.
+    Does nothing when trace is None.
+    """
+    if trace is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages = trace.setdefault("stages", {})
+        stages[stage] = stages.get(stage, 0.0) + (time.perf_counter() - start) * 1000
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY,
+            ts REAL NOT NULL,
+            kind TEXT NOT NULL,
+            query TEXT,
+            latency_ms REAL,
+            stages TEXT,
+            result_codes TEXT,
+            result_count INTEGER,
+            top_similarity REAL,
+            cache_hit INTEGER,
+            error TEXT
+        )
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS events_ts ON events (ts)")
+    conn.commit()
+    return conn
+
+
+class TelemetrySink:
+    """
+    Queue plus writer thread. The thread is started on the first event and
+    flushes when TELEMETRY_BATCH_SIZE events are waiting or
+    TELEMETRY_FLUSH_SECONDS have passed, and once more at exit.
+    """
+
+    def __init__(
+        self,
+        path: str = TELEMETRY_DB_PATH,
+        batch_size: int = TELEMETRY_BATCH_SIZE,
+        flush_seconds: float = TELEMETRY_FLUSH_SECONDS,
+        max_queue: int = TELEMETRY_QUEUE_SIZE,
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def record(self, event: dict) -> None:
+        """Queue one event for writing. Never blocks."""
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="hts-telemetry", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self) -> None:
+        conn = _connect(self.path)
+        batch = []
+        deadline = None
+
+        while True:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                event = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                event = None
+
+            if event is not None and event is not _STOP:
+                batch.append(event)
+                deadline = deadline or time.monotonic() + self.flush_seconds
+
+            if batch and (event is None or event is _STOP or len(batch) >= self.batch_size):
+                self._write(conn, batch)
+                batch, deadline = [], None
+
+            if event is _STOP:
+                conn.close()
+                return
+
+    def _write(self, conn: sqlite3.Connection, batch: list[dict]) -> None:
+        rows = [
+            (
+                e.get("ts", time.time()),
+                e.get("kind", "search"),
+                e.get("query"),
+                e.get("latency_ms"),
+                json.dumps(e.get("stages") or {}),
+                json.dumps(e.get("result_codes") or []),
+                e.get("result_count"),
+                e.get("top_similarity"),
+                None if e.get("cache_hit") is None else int(bool(e["cache_hit"])),
+                e.get("error"),
+            )
+            for e in batch
+        ]
+        try:
+            with conn:
+                conn.executemany(
+                    f"INSERT INTO events ({', '.join(EVENT_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(EVENT_COLUMNS))})",
+                    rows,
+                )
+        except Exception as e:
+            print(f"⚠️ Telemetry write failed, {len(rows)} events lost: {str(e)}")
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Write whatever is queued and stop the writer thread."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+
+def get_telemetry() -> TelemetrySink | None:
+    """Return the shared telemetry sink, or None when disabled."""
+    global _sink
+
+    if not TELEMETRY_ENABLED:
+        return None
+
+    if _sink is None:
+        with _sink_lock:
+            if _sink is None:
+                _sink = TelemetrySink()
+    return _sink
+
+
+def read_events(since: float | None = None, limit: int = 10000, path: str = TELEMETRY_DB_PATH) -> list[dict]:
+    """
+    Most recent events first, with stages and result_codes decoded.
+    Events still waiting in the queue are not included.
+    """
+    if not os.path.exists(path):
+        return []
+
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    try:
+        rows = conn.execute(
+            "SELECT * FROM events WHERE ts >= ? ORDER BY ts DESC LIMIT ?",
+            (since or 0, limit),
+        ).fetchall()
+    finally:
+        conn.close()
+
+    events = []
+    for row in rows:
+        event = dict(row)
+        event["stages"] = json.loads(event["stages"] or "{}")
+        event["result_codes"] = json.loads(event["result_codes"] or "[]")
+        events.append(event)
+    return events
+
+
+def _percentile(values: list[float], pct: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+
+def summarize(events: list[dict]) -> dict:
+    """
+    Aggregate events for the Analytics page: counts, latency percentiles,
+    mean latency per stage, cache hit rate, daily volume and the chapters
+    of the top results.
+    """
+    latencies = [e["latency_ms"] for e in events if e.get("latency_ms") is not None]
+    cache_flags = [e["cache_hit"] for e in events if e.get("cache_hit") is not None]
+    similarities = [e["top_similarity"] for e in events if e.get("top_similarity") is not None]
+
+    stage_times = {}
+    for event in events:
+        for stage, ms in event["stages"].items():
+            stage_times.setdefault(stage, []).append(ms)
+
+    daily, chapters, kinds = {}, {}, {}
+    for event in events:
+        day = time.strftime("%Y-%m-%d", time.gmtime(event["ts"]))
+        daily[day] = daily.get(day, 0) + 1
+        kinds[event["kind"]] = kinds.get(event["kind"], 0) + 1
+        if event["result_codes"]:
+            chapter = event["result_codes"][0][:2]
+            chapters[chapter] = chapters.get(chapter, 0) + 1
+
+    return {
+        "count": len(events),
+        "errors": sum(1 for e in events if e.get("error")),
+        "kinds": kinds,
+        "p50_ms": _percentile(latencies, 50),
+        "p95_ms": _percentile(latencies, 95),
+        "stage_ms": {stage: sum(v) / len(v) for stage, v in stage_times.items()},
+        "cache_hit_rate": sum(cache_flags) / len(cache_flags) if cache_flags else None,
+        "mean_top_similarity": sum(similarities) / len(similarities) if similarities else None,
+        "daily": dict(sorted(daily.items())),
+        "chapters": dict(sorted(chapters.items(), key=lambda kv: kv[1], reverse=True)),
+    }
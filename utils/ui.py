@@ -118,17 +118,32 @@ def similarity_bar(score: float) -> str:
     return f'<div style="width: 100%; height: 4px; background: #30363d; border-radius: 2px; margin: 8px 0;"><div style="width: {percentage}%; height: 100%; background: #58a6ff; border-radius: 2px;"></div></div>'
 
 
+# Labels for results that have no similarity score
+MATCH_LABELS = {"code": "Code Match", "keyword": "Keyword Match"}
+
+
+def match_badge(match_source: str) -> str:
+    """Label for a result found by code or keyword lookup instead of embeddings."""
+    label = MATCH_LABELS.get(match_source, "")
+    return f'<span style="color: #8b949e; font-weight: 700;">{label}</span>' if label else ""
+
+
 def result_card(
     hts_code: str,
     title: str,
     description: str,
-    similarity: float = 0.0,
+    similarity: float | None = None,
     duty_rate: str = "",
     show_explain: bool = False,
+    match_source: str = "",
 ) -> None:
-    """Render a clean result card."""
-    confidence = confidence_badge(similarity) if similarity > 0 else ""
-    sim_bar = similarity_bar(similarity) if similarity > 0 else ""
+    """Render a clean result card. Results without a similarity are labelled by match_source."""
+    if similarity:
+        confidence = confidence_badge(similarity)
+        sim_bar = similarity_bar(similarity)
+    else:
+        confidence = match_badge(match_source)
+        sim_bar = ""
     
     # Remove all newlines within HTML to prevent Streamlit markdown parser from breaking out
     content = (
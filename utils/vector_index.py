@@ -0,0 +1,198 @@
+"""
+HTS Dashboard - In-Process Vector Index
+
+This module keeps the full HTS embedding matrix in memory so similarity
+search can run locally instead of through the match_hts_chunks RPC.
+The matrix is L2-normalized once at load time, so cosine similarity is a
+single matrix-vector product.
+"""
+
+import os
+import json
+import numpy as np
+
+LOCAL_INDEX_PATH = os.environ.get("LOCAL_INDEX_PATH", ".hts_cache/hts_index.npz")
+LOCAL_INDEX_DTYPE = os.environ.get("LOCAL_INDEX_DTYPE", "float32")
+
+# Rows scored per block when the matrix is stored as float16
+SCORE_BLOCK_ROWS = 4096
+
+# PostgREST caps responses at 1000 rows by default
+FETCH_PAGE_SIZE = 1000
+
+# Code-prefix filter masks kept per index
+MAX_PREFIX_MASKS = 64
+
+
+def _parse_embedding(value) -> list:
+    """pgvector columns come back from PostgREST as '[0.1,0.2,...]' strings."""
+    if isinstance(value, str):
+        return json.loads(value)
+    return value
+
+
+def _count_rows(client, table: str) -> int:
+    """Number of rows with an embedding (0 when the count is unavailable)."""
+    try:
+        response = client.table(table)\
+            .select("id", count="exact")\
+            .not_.is_("embedding", "null")\
+            .limit(1)\
+            .execute()
+        return response.count or 0
+    except Exception as e:
+        print(f"⚠️ Could not count embedded rows, growing the index as it loads: {str(e)}")
+        return 0
+
+
+class LocalVectorIndex:
+    """
+    Contiguous, normalized embedding matrix plus the row metadata needed to
+    render search results.
+    """
+
+    def __init__(self, rows: list[dict], matrix: np.ndarray, dtype: str = "float32", normalized: bool = False):
+        if len(rows) != matrix.shape[0]:
+            raise ValueError(f"Index metadata has {len(rows)} rows but matrix has {matrix.shape[0]}")
+
+        if not normalized:
+            matrix = np.asarray(matrix, dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            matrix /= norms
+
+        self.rows = rows
+        self.matrix = np.ascontiguousarray(matrix, dtype=dtype)
+        self.dim = self.matrix.shape[1]
+        self._codes = None
+        self._prefix_masks = {}
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @classmethod
+    def from_supabase(cls, client, table: str, dtype: str = LOCAL_INDEX_DTYPE) -> "LocalVectorIndex":
+        """
+        Page through the knowledge base table and build an index from every
+        row that has an embedding.
+
+        Vectors are written page by page into one preallocated float32
+        matrix (sized from a row count and grown if more rows arrive), so
+        peak memory stays close to the size of the index instead of holding
+        every embedding as Python floats.
+        """
+        rows = []
+        matrix = None
+        capacity = _count_rows(client, table)
+        last_id = 0
+
+        while True:
+            response = client.table(table)\
+                .select("id, hts_code, title, normalized_text, embedding")\
+                .gt("id", last_id)\
+                .order("id")\
+                .limit(FETCH_PAGE_SIZE)\
+                .execute()
+
+            batch = response.data or []
+            if not batch:
+                break
+
+            for row in batch:
+                embedding = row.pop("embedding", None)
+                if embedding is None:
+                    continue
+
+                vector = np.asarray(_parse_embedding(embedding), dtype=np.float32)
+                if matrix is None:
+                    matrix = np.empty((max(capacity, FETCH_PAGE_SIZE), vector.shape[0]), dtype=np.float32)
+                elif len(rows) == matrix.shape[0]:
+                    # In-place realloc; nothing else references the buffer
+                    matrix.resize((matrix.shape[0] * 2, matrix.shape[1]), refcheck=False)
+
+                matrix[len(rows)] = vector
+                rows.append(row)
+
+            last_id = batch[-1]["id"]
+
+        if not rows:
+            raise ValueError(f"No embedded rows found in '{table}'")
+
+        # Trim unused capacity so a slice view does not pin the larger buffer
+        matrix.resize((len(rows), matrix.shape[1]), refcheck=False)
+        return cls(rows, matrix, dtype=dtype)
+
+    @classmethod
+    def load(cls, path: str = LOCAL_INDEX_PATH) -> "LocalVectorIndex":
+        """Load an index previously written with save()."""
+        with np.load(path) as data:
+            matrix = data["matrix"]
+            rows = json.loads(data["rows"].tobytes().decode("utf-8"))
+
+        return cls(rows, matrix, dtype=matrix.dtype, normalized=True)
+
+    def save(self, path: str = LOCAL_INDEX_PATH) -> None:
+        """Write the normalized matrix and row metadata to a single .npz file."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        payload = json.dumps(self.rows, ensure_ascii=False).encode("utf-8")
+        np.savez(path, matrix=self.matrix, rows=np.frombuffer(payload, dtype=np.uint8))
+
+    def _scores(self, query: np.ndarray) -> np.ndarray:
+        if self.matrix.dtype == np.float32:
+            return self.matrix @ query
+
+        # Upcast float16 storage block by block so BLAS is still used
+        scores = np.empty(len(self.rows), dtype=np.float32)
+        for start in range(0, len(self.rows), SCORE_BLOCK_ROWS):
+            block = self.matrix[start:start + SCORE_BLOCK_ROWS].astype(np.float32)
+            scores[start:start + SCORE_BLOCK_ROWS] = block @ query
+        return scores
+
+    def _prefix_mask(self, code_prefix: str) -> np.ndarray:
+        """Boolean mask of rows whose hts_code starts with `code_prefix`."""
+        if code_prefix not in self._prefix_masks:
+            if self._codes is None:
+                self._codes = np.array([row.get("hts_code") or "" for row in self.rows])
+            if len(self._prefix_masks) >= MAX_PREFIX_MASKS:
+                self._prefix_masks.clear()
+            self._prefix_masks[code_prefix] = np.char.startswith(self._codes, code_prefix)
+        return self._prefix_masks[code_prefix]
+
+    def search(self, vector, limit: int = 5, code_prefix: str | None = None, min_similarity: float | None = None) -> list[dict]:
+        """
+        Return the top `limit` rows by cosine similarity, in the same shape
+        as the match_hts_chunks RPC response. The optional filters match the
+        RPC's code_prefix and min_similarity parameters.
+        """
+        query = np.asarray(vector, dtype=np.float32)
+        if query.shape[0] != self.dim:
+            raise ValueError(f"Vector dimension mismatch: index has {self.dim}, query has {query.shape[0]}")
+
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+
+        scores = self._scores(query)
+        if code_prefix:
+            scores = np.where(self._prefix_mask(code_prefix), scores, -np.inf)
+        limit = min(int(limit), len(scores))
+        if limit <= 0:
+            return []
+
+        if limit < len(scores):
+            top = np.argpartition(-scores, limit - 1)[:limit]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+
+        floor = -np.inf if min_similarity is None else min_similarity
+        top = top[scores[top] >= floor]
+        top = top[np.isfinite(scores[top])]
+
+        return [
+            {**self.rows[i], "similarity": float(scores[i])}
+            for i in top
+        ]